@@ -0,0 +1,38 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import OutgoingEmail, StoredFile, Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "name",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_at",
+    )
+    list_filter = ("status", "name")
+    actions = ("retry",)
+
+    def retry(self, request, queryset):
+        queryset.update(
+            status=Task.QUEUED, attempts=0, run_at=timezone.now()
+        )
+
+    retry.short_description = "Повторить выбранные задачи"
+
+
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ("name", "refs")
+    search_fields = ("name",)
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ("pk", "created", "claimed_until")
+
+
+admin.site.register(Task, TaskAdmin)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
+admin.site.register(StoredFile, StoredFileAdmin)
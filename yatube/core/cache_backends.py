@@ -0,0 +1,206 @@
+"""Кэш в файле SQLite, общий для всех процессов на одной машине.
+
+Локальная замена memcached/redis: воркеры gunicorn открывают один и тот
+же файл в режиме WAL, поэтому видят записи и инвалидацию друг друга.
+``incr`` атомарен между процессами за счет ``BEGIN IMMEDIATE``.
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache ("
+    "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)",
+    "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)",
+)
+# SQLite ограничивает число параметров одного запроса.
+MAX_PARAMS = 500
+CULL_PROBABILITY = 0.01
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    @staticmethod
+    def _alive(expires):
+        return expires is None or expires > time.time()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with _immediate(connection):
+            connection.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?",
+                (key, time.time()),
+            )
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO cache VALUES (?, ?, ?)",
+                (key, _dumps(value), self._expires(timeout)),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        row = (
+            self._connection()
+            .execute("SELECT value, expires FROM cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        if row is None or not self._alive(row[1]):
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)",
+            (key, _dumps(value), self._expires(timeout)),
+        )
+        self._maybe_cull()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self._expires(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            "DELETE FROM cache WHERE key = ?", (key,)
+        )
+        return cursor.rowcount == 1
+
+    def get_many(self, keys, version=None):
+        names = {self._key(key, version): key for key in keys}
+        found = {}
+        connection = self._connection()
+        batch = list(names)
+        for start in range(0, len(batch), MAX_PARAMS):
+            chunk = batch[start: start + MAX_PARAMS]
+            rows = connection.execute(
+                "SELECT key, value, expires FROM cache WHERE key IN (%s)"
+                % ", ".join("?" * len(chunk)),
+                chunk,
+            )
+            for name, value, expires in rows:
+                if self._alive(expires):
+                    found[names[name]] = pickle.loads(value)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expires(timeout)
+        rows = [
+            (self._key(key, version), _dumps(value), expires)
+            for key, value in data.items()
+        ]
+        connection = self._connection()
+        with _immediate(connection):
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?)", rows
+            )
+        self._maybe_cull()
+        return []
+
+    def delete_many(self, keys, version=None):
+        connection = self._connection()
+        with _immediate(connection):
+            connection.executemany(
+                "DELETE FROM cache WHERE key = ?",
+                [(self._key(key, version),) for key in keys],
+            )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = (
+            self._connection()
+            .execute("SELECT expires FROM cache WHERE key = ?", (key,))
+            .fetchone()
+        )
+        return row is not None and self._alive(row[0])
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        with _immediate(connection):
+            row = connection.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or not self._alive(row[1]):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                "UPDATE cache SET value = ? WHERE key = ?",
+                (_dumps(value), key),
+            )
+        return value
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def _maybe_cull(self):
+        if random.random() >= CULL_PROBABILITY:
+            return
+        connection = self._connection()
+        connection.execute(
+            "DELETE FROM cache WHERE expires <= ?", (time.time(),)
+        )
+        (count,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self._max_entries and self._cull_frequency == 0:
+            connection.execute("DELETE FROM cache")
+        elif count > self._max_entries:
+            connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                "ORDER BY expires IS NULL, expires LIMIT ?)",
+                (count // self._cull_frequency,),
+            )
+
+
+def _dumps(value):
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+@contextmanager
+def _immediate(connection):
+    """Транзакция с немедленной блокировкой записи."""
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
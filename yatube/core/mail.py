@@ -0,0 +1,87 @@
+"""Асинхронная отправка почты через очередь фоновых задач.
+
+``QueuedEmailBackend`` в запросе только сохраняет письма в таблицу
+``OutgoingEmail`` и ставит задачу ``flush``, если она еще не ждет в
+очереди. Задача забирает письма пачками по ``EMAIL_BATCH_SIZE`` и
+отправляет каждую пачку через одно соединение бэкенда
+``QUEUED_EMAIL_BACKEND`` (для файлового бэкенда — один файл на пачку).
+Строка письма удаляется сразу после его отправки, поэтому ошибка на
+середине пачки не отправит уже ушедшие письма повторно. Пачка
+захватывается на ``TASKS_VISIBILITY_TIMEOUT``: если воркер упадет,
+оставшиеся письма отправит следующий запуск.
+"""
+import pickle
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import OutgoingEmail
+from .tasks import enqueue_unique, task
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            # Соединение принадлежит запросу, воркер откроет свое.
+            message.connection = None
+            rows.append(
+                OutgoingEmail(
+                    message=pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+                )
+            )
+        if not rows:
+            return 0
+        OutgoingEmail.objects.bulk_create(rows)
+        enqueue_unique(flush)
+        return len(rows)
+
+
+def _available(now):
+    return OutgoingEmail.objects.filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+    )
+
+
+def _claim(batch_size):
+    now = timezone.now()
+    ids = list(
+        _available(now)
+        .order_by("pk")
+        .values_list("pk", flat=True)[:batch_size]
+    )
+    until = now + timedelta(seconds=settings.TASKS_VISIBILITY_TIMEOUT)
+    _available(now).filter(pk__in=ids).update(claimed_until=until)
+    return list(OutgoingEmail.objects.filter(pk__in=ids, claimed_until=until))
+
+
+@task
+def flush(batch_size=None):
+    """Фоновая задача: отправляет накопившиеся письма пачками."""
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    sent = 0
+    while True:
+        batch = _claim(batch_size)
+        if not batch:
+            return sent
+        with get_connection(settings.QUEUED_EMAIL_BACKEND) as connection:
+            for row in batch:
+                message = pickle.loads(bytes(row.message))
+                sent += connection.send_messages([message]) or 0
+                OutgoingEmail.objects.filter(pk=row.pk).delete()
+
+
+def depth():
+    """Глубина очереди: число писем и возраст самого старого в секундах."""
+    stats = OutgoingEmail.objects.aggregate(
+        emails=Count("pk"), oldest=Min("created")
+    )
+    oldest = stats.pop("oldest")
+    stats["oldest_age"] = (
+        (timezone.now() - oldest).total_seconds() if oldest else 0
+    )
+    return stats
@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import random
+import tempfile
+from time import perf_counter
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SQLiteCache
+
+PARAMS = {"OPTIONS": {"MAX_ENTRIES": 100000}}
+BACKENDS = {
+    "locmem": lambda path: LocMemCache("bench", PARAMS),
+    "sqlite": lambda path: SQLiteCache(path, PARAMS),
+}
+
+
+def _worker(args):
+    """Один воркер: чтение ключа, при промахе - запись, как у фрагментов."""
+    backend, path, requests, keys, seed = args
+    cache = BACKENDS[backend](path)
+    rng = random.Random(seed)
+    value = "x" * 2048
+    hits = 0
+    spent = 0.0
+    for _ in range(requests):
+        key = f"page:{int(keys * rng.random() ** 2)}"
+        started = perf_counter()
+        if cache.get(key) is None:
+            cache.set(key, value, 300)
+        else:
+            hits += 1
+        spent += perf_counter() - started
+    return hits, spent
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает долю попаданий и задержку locmem и общего SQLite-кэша "
+        "при нескольких воркерах."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument("--keys", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        self.stdout.write(
+            f"{'backend':<8} {'hit ratio':>10} {'us/request':>12}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite3")
+            for backend in BACKENDS:
+                jobs = [
+                    (
+                        backend,
+                        path,
+                        options["requests"],
+                        options["keys"],
+                        seed,
+                    )
+                    for seed in range(workers)
+                ]
+                with multiprocessing.Pool(workers) as pool:
+                    results = pool.map(_worker, jobs)
+                total = workers * options["requests"]
+                hits = sum(hits for hits, _ in results)
+                spent = sum(spent for _, spent in results)
+                self.stdout.write(
+                    f"{backend:<8} {hits / total:>10.3f} "
+                    f"{spent / total * 1e6:>12.1f}"
+                )
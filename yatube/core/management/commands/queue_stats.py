@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core import mail, tasks
+
+
+class Command(BaseCommand):
+    help = "Показывает глубину очереди фоновых задач и исходящей почты."
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'task':<40} {'ready':>7} {'delayed':>8} {'failed':>7}"
+        )
+        for name, counts in tasks.depth().items():
+            self.stdout.write(
+                f"{name:<40} {counts['ready']:>7} "
+                f"{counts['delayed']:>8} {counts['failed']:>7}"
+            )
+        emails = mail.depth()
+        self.stdout.write(
+            f"Писем в очереди: {emails['emails']}, самому старому "
+            f"{emails['oldest_age']:.0f} с."
+        )
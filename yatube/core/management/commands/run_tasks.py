@@ -0,0 +1,44 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import tasks
+
+
+class Command(BaseCommand):
+    help = "Выполняет фоновые задачи из очереди в базе данных."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.TASKS_CONCURRENCY,
+            help="Число потоков-воркеров.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.TASKS_POLL_INTERVAL,
+            help="Пауза между опросами пустой очереди, в секундах.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить готовые задачи и завершиться.",
+        )
+
+    def handle(self, *args, **options):
+        stop, threads = tasks.start_workers(
+            options["concurrency"], options["poll_interval"], options["once"]
+        )
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS("Воркеры остановлены."))
@@ -0,0 +1,172 @@
+"""Раздача загруженных файлов из ``MEDIA_ROOT``.
+
+Условные запросы (``If-None-Match``, ``If-Modified-Since``) отвечают 304
+без чтения файла. При ``MEDIA_SENDFILE`` байты отдает веб-сервер по
+заголовку ``X-Sendfile`` или ``X-Accel-Redirect``. Иначе файл целиком
+отдается через ``FileResponse``, который сервер WSGI передает в
+``sendfile``, а запрос с ``Range`` получает 206 с нужным куском.
+Имена с хэшем содержимого не меняются, поэтому кэшируются навсегда.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+from django.views.decorators.http import require_safe
+
+SENDFILE_HEADERS = ("X-Sendfile", "X-Accel-Redirect")
+# Имена вида <хэш>.<расширение>: картинки постов и миниатюры sorl.
+HASHED_NAME = re.compile(r"(^|/)[0-9a-f]{32,}\.\w+$")
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+class RangeFile:
+    """Файл, из которого читается только отрезок ``[start, start+length)``.
+
+    У обертки нет ``fileno``, поэтому сервер не отдаст через ``sendfile``
+    файл целиком вместо куска.
+    """
+
+    def __init__(self, file_, start, length):
+        file_.seek(start)
+        self.file = file_
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Отрезок (начало, длина) из заголовка ``Range``.
+
+    ``None`` — заголовок не поддерживается и файл отдается целиком,
+    ``ValueError`` — отрезок вне файла.
+    """
+    match = RANGE.match(header.replace(" ", ""))
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = min(int(last), size)
+        if not length:
+            raise ValueError(header)
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def _path(name):
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+        stat_result = os.stat(path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404(name)
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise Http404(name)
+    return path, stat_result
+
+
+def _validators(stat_result):
+    etag = quote_etag(
+        "%x-%x" % (stat_result.st_mtime_ns, stat_result.st_size)
+    )
+    # ``If-Modified-Since`` точен до секунды, как и ``django.views.static``.
+    return etag, int(stat_result.st_mtime)
+
+
+def _set_headers(response, name, etag, last_modified):
+    if response.status_code >= 400:
+        return response
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    if HASHED_NAME.search(name):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.MEDIA_CACHE_TIMEOUT
+        )
+    return response
+
+
+def _content_type(path):
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _sendfile(path, name):
+    """Пустой ответ: тело и ``Range`` обрабатывает веб-сервер."""
+    response = HttpResponse(content_type=_content_type(path))
+    header = settings.MEDIA_SENDFILE
+    if header == "X-Accel-Redirect":
+        # nginx декодирует адрес, как и адрес запроса.
+        response[header] = settings.MEDIA_ACCEL_REDIRECT_LOCATION + quote(
+            name
+        )
+    else:
+        response[header] = path
+    return response
+
+
+def _file_response(request, path, size, etag):
+    content_type = _content_type(path)
+    header = request.META.get("HTTP_RANGE")
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if header and if_range and etag not in parse_etags(if_range):
+        header = None
+    try:
+        part = header and parse_range(header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    if not part:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = size
+        return response
+    start, length = part
+    response = FileResponse(
+        RangeFile(open(path, "rb"), start, length),
+        status=206,
+        content_type=content_type,
+    )
+    response["Content-Length"] = length
+    response["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Отдает файл из ``MEDIA_ROOT`` по относительному пути."""
+    full_path, stat_result = _path(path)
+    etag, last_modified = _validators(stat_result)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        if settings.MEDIA_SENDFILE in SENDFILE_HEADERS:
+            response = _sendfile(full_path, path)
+        else:
+            response = _file_response(
+                request, full_path, stat_result.st_size, etag
+            )
+    return _set_headers(response, path, etag, last_modified)
@@ -0,0 +1,74 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    QUEUED = "queued"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (FAILED, "Упала"),
+    )
+
+    name = models.CharField(max_length=200, verbose_name="Функция")
+    payload = models.TextField(verbose_name="Аргументы")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name="Состояние",
+    )
+    attempts = models.PositiveIntegerField(
+        default=0, verbose_name="Попыток"
+    )
+    max_attempts = models.PositiveIntegerField(verbose_name="Лимит попыток")
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Выполнить после"
+    )
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Создана")
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(
+                fields=["status", "run_at"], name="task_status_run_at_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
+
+
+class OutgoingEmail(models.Model):
+    message = models.BinaryField(verbose_name="Письмо")
+    created = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name="Создано"
+    )
+    claimed_until = models.DateTimeField(
+        null=True, blank=True, verbose_name="Отправляется до"
+    )
+
+    class Meta:
+        verbose_name = "Исходящее письмо"
+        verbose_name_plural = "Исходящие письма"
+
+    def __str__(self):
+        return f"Письмо #{self.pk}"
+
+
+class StoredFile(models.Model):
+    """Число ссылок на файл хранилища с адресацией по содержимому."""
+
+    name = models.CharField(
+        max_length=255, primary_key=True, verbose_name="Имя файла"
+    )
+    refs = models.IntegerField(default=0, verbose_name="Ссылок")
+
+    class Meta:
+        verbose_name = "Файл хранилища"
+        verbose_name_plural = "Файлы хранилища"
+
+    def __str__(self):
+        return self.name
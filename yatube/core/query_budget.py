@@ -0,0 +1,58 @@
+"""Бюджет SQL-запросов на один HTTP-запрос.
+
+Вью объявляет бюджет декоратором ``query_budget``; middleware считает
+запросы к базе за весь цикл запроса и при превышении пишет в лог или,
+если включен ``QUERY_BUDGET_RAISE``, выбрасывает ``QueryBudgetExceeded``.
+"""
+import logging
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(limit):
+    """Объявляет допустимое число запросов к базе для вью."""
+
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+
+    return decorator
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        budget = getattr(request, "query_budget", None)
+        if budget is not None and counter.count > budget:
+            message = (
+                f"{request.path}: {counter.count} запросов к базе "
+                f"при бюджете {budget}"
+            )
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, "query_budget", None)
@@ -0,0 +1,91 @@
+"""Кэширование дорогих значений без лавины пересчетов.
+
+``fetch`` хранит значение вместе с моментом истечения и временем расчета.
+Пересчет выполняет только владелец блокировки (``cache.add`` со случайным
+токеном), остальные в это время получают устаревшее значение. Без
+устаревшего значения они ждут первого расчета не дольше
+``STAMPEDE_WAIT_TIMEOUT``, а затем считают сами, не занимая воркер до
+истечения блокировки. Истечение наступает вероятностно раньше срока
+(XFetch): чем дольше расчет, тем раньше один из запросов возьмется его
+обновить.
+"""
+import math
+import random
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+WAIT_INTERVAL = 0.05
+
+
+def _lock_key(key):
+    return f"{key}:lock"
+
+
+def _should_refresh(expires, delta):
+    early = -delta * settings.STAMPEDE_BETA * math.log(1.0 - random.random())
+    return time.time() + early >= expires
+
+
+def _acquire(key):
+    """Токен взятой блокировки или None, если ее держит другой запрос."""
+    token = secrets.token_hex(8)
+    if cache.add(_lock_key(key), token, settings.STAMPEDE_LOCK_TIMEOUT):
+        return token
+    return None
+
+
+def _release(key, token):
+    """Снимает блокировку, только если она еще наша.
+
+    Расчет дольше ``STAMPEDE_LOCK_TIMEOUT`` мог отдать блокировку другому
+    запросу, и ее нельзя удалять. У кэша Django нет атомарного сравнения с
+    удалением, но окно между ними несравнимо короче расчета.
+    """
+    lock_key = _lock_key(key)
+    if cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _store(key, compute, timeout):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    cache.set(
+        key,
+        (value, time.time() + timeout, delta),
+        timeout + settings.STAMPEDE_STALE_TIMEOUT,
+    )
+    return value
+
+
+def _refresh(key, token, compute, timeout):
+    try:
+        return _store(key, compute, timeout)
+    finally:
+        _release(key, token)
+
+
+def fetch(key, compute, timeout):
+    """Значение из кэша; при промахе ``compute`` вызывается один раз."""
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires, delta = entry
+        if not _should_refresh(expires, delta):
+            return value
+        token = _acquire(key)
+        if token is None:
+            return value
+        return _refresh(key, token, compute, timeout)
+    token = _acquire(key)
+    if token is not None:
+        return _refresh(key, token, compute, timeout)
+    deadline = time.monotonic() + settings.STAMPEDE_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return _store(key, compute, timeout)
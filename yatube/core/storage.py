@@ -0,0 +1,80 @@
+"""Хранилище файлов с адресацией по содержимому.
+
+Имя файла — SHA-256 его содержимого, поэтому одинаковые загрузки пишутся
+на диск один раз и получают одно и то же имя. Ссылки на файл считает
+строка ``StoredFile``: ``save`` увеличивает счетчик до проверки, есть ли
+файл на диске, а удаление (``delete_if_unused``) стирает строку и файл в
+одной транзакции. Блокировка строки упорядочивает их: сохранение либо
+успевает взять ссылку и файл остается, либо ждет удаления и пишет файл
+заново.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+from .models import StoredFile
+
+
+def content_hash(content):
+    """SHA-256 содержимого; считается один раз на объект файла."""
+    digest = getattr(content, "_content_hash", None)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        digest = content._content_hash = sha256.hexdigest()
+    return digest
+
+
+def acquire(name):
+    """Добавляет ссылку на файл."""
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name)], ignore_conflicts=True
+    )
+    StoredFile.objects.filter(name=name).update(refs=F("refs") + 1)
+
+
+def release(name):
+    """Убирает ссылку на файл; сам файл удаляет ``delete_if_unused``."""
+    StoredFile.objects.filter(name=name).update(refs=F("refs") - 1)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def hashed_name(self, name, content):
+        """``<каталог>/<2 символа хэша>/<хэш><расширение>``."""
+        directory, filename = os.path.split(name)
+        digest = content_hash(content)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        with transaction.atomic():
+            acquire(name)
+            if not self.exists(name):
+                name = super().save(name, content, max_length=max_length)
+        return name
+
+    def delete_if_unused(self, name, delete):
+        """Вызывает ``delete(name)``, если на файл не осталось ссылок.
+
+        Файл без строки ``StoredFile`` не трогается: его сохранили в обход
+        счетчика.
+        """
+        with transaction.atomic():
+            unused = StoredFile.objects.filter(name=name, refs__lte=0)
+            if not unused.delete()[0]:
+                return False
+            delete(name)
+        return True
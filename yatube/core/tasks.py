@@ -0,0 +1,199 @@
+"""Очередь фоновых задач в базе данных, без внешнего брокера.
+
+Задача — функция с декоратором ``@task``. ``delay`` пишет строку ``Task``
+в текущей транзакции: воркер увидит задачу только после фиксации, а при
+откате она пропадет вместе с данными. Воркер (``run_tasks``) захватывает
+задачу, сдвигая ее ``run_at`` на ``TASKS_VISIBILITY_TIMEOUT``; если он
+упадет, задачу по истечении таймаута подхватит другой, поэтому задачи
+должны переносить повторный запуск. Ошибка откладывает повтор с
+экспоненциальной паузой, после ``max_attempts`` попыток задача остается
+в таблице со статусом ``failed``.
+"""
+import json
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Сколько готовых задач просматривать за одну попытку захвата.
+CLAIM_BATCH = 20
+
+_registry = {}
+
+
+def task(func=None, *, max_attempts=None):
+    """Делает функцию фоновой задачей: ``func.delay(*args, **kwargs)``.
+
+    Аргументы должны сериализоваться в JSON.
+    """
+
+    def decorator(func):
+        func.task_name = f"{func.__module__}.{func.__qualname__}"
+        func.max_attempts = max_attempts
+        func.delay = lambda *args, **kwargs: enqueue(func, args, kwargs)
+        _registry[func.task_name] = func
+        return func
+
+    return decorator if func is None else decorator(func)
+
+
+def enqueue(func, args=(), kwargs=None, countdown=0):
+    """Ставит задачу в очередь; выполнится не раньше чем через countdown."""
+    return Task.objects.create(
+        name=func.task_name,
+        payload=json.dumps([list(args), kwargs or {}]),
+        max_attempts=func.max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=countdown),
+    )
+
+
+def enqueue_unique(func, args=(), kwargs=None):
+    """Ставит задачу, если такая же еще ждет в очереди и не начата.
+
+    Ждущая строка блокируется до конца транзакции вызывающего, поэтому
+    воркер не захватит ее раньше, чем станут видны новые данные.
+    """
+    payload = json.dumps([list(args), kwargs or {}])
+    with transaction.atomic():
+        pending = (
+            Task.objects.select_for_update()
+            .filter(
+                name=func.task_name,
+                payload=payload,
+                status=Task.QUEUED,
+                attempts=0,
+            )
+            .values_list("pk", flat=True)[:1]
+        )
+        if list(pending):
+            return None
+        return enqueue(func, args, kwargs)
+
+
+def _resolve(name):
+    func = _registry.get(name)
+    return func if func is not None else import_string(name)
+
+
+def backoff(attempts):
+    """Пауза перед следующей попыткой, в секундах."""
+    return min(
+        settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.TASKS_RETRY_BACKOFF_MAX,
+    )
+
+
+def claim():
+    """Захватывает готовую задачу; ``None``, если таких нет."""
+    now = timezone.now()
+    candidates = list(
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        .order_by("run_at")
+        .values_list("pk", "run_at")[:CLAIM_BATCH]
+    )
+    # Воркеры начинают с разных задач, чтобы реже сталкиваться.
+    random.shuffle(candidates)
+    hidden_until = now + timedelta(seconds=settings.TASKS_VISIBILITY_TIMEOUT)
+    for pk, run_at in candidates:
+        claimed = Task.objects.filter(
+            pk=pk, status=Task.QUEUED, run_at=run_at
+        ).update(run_at=hidden_until, attempts=F("attempts") + 1)
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(job):
+    """Выполняет захваченную задачу и удаляет ее или планирует повтор."""
+    args, kwargs = json.loads(job.payload)
+    try:
+        _resolve(job.name)(*args, **kwargs)
+    except Exception:
+        logger.exception("Задача %s упала", job)
+        _fail(job, traceback.format_exc())
+        return False
+    Task.objects.filter(pk=job.pk).delete()
+    return True
+
+
+def _fail(job, error):
+    jobs = Task.objects.filter(pk=job.pk)
+    if job.attempts >= job.max_attempts:
+        jobs.update(status=Task.FAILED, last_error=error)
+    else:
+        jobs.update(
+            run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            last_error=error,
+        )
+
+
+def depth():
+    """Число задач по функциям: готовых, отложенных и упавших."""
+    now = timezone.now()
+    queued = Q(status=Task.QUEUED)
+    rows = (
+        Task.objects.order_by("name")
+        .values("name")
+        .annotate(
+            ready=Count("pk", filter=queued & Q(run_at__lte=now)),
+            delayed=Count("pk", filter=queued & Q(run_at__gt=now)),
+            failed=Count("pk", filter=Q(status=Task.FAILED)),
+        )
+    )
+    return {row.pop("name"): row for row in rows}
+
+
+def run_pending(limit=None):
+    """Выполняет готовые задачи в текущем потоке; возвращает их число."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim()
+        if job is None:
+            break
+        execute(job)
+        done += 1
+    return done
+
+
+def work(stop, poll_interval, once=False):
+    """Цикл воркера: до ``stop`` или, при ``once``, до пустой очереди."""
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            job = claim()
+            if job is not None:
+                execute(job)
+            elif once:
+                break
+            else:
+                stop.wait(poll_interval)
+    finally:
+        connection.close()
+
+
+def start_workers(concurrency, poll_interval, once=False):
+    """Запускает воркеры в потоках; возвращает событие остановки и потоки."""
+    stop = threading.Event()
+    threads = [
+        threading.Thread(
+            target=work,
+            args=(stop, poll_interval, once),
+            name=f"task-worker-{number}",
+            daemon=True,
+        )
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    return stop, threads
@@ -0,0 +1,50 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core import stampede
+
+register = template.Library()
+
+
+class StampedeCacheNode(template.Node):
+    def __init__(self, nodelist, timeout_var, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.timeout_var = timeout_var
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            timeout = int(self.timeout_var.resolve(context))
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f"stampede_cache: неверный таймаут {self.timeout_var.var!r}"
+            )
+        key = make_template_fragment_key(
+            f"stampede.{self.fragment_name}",
+            [var.resolve(context) for var in self.vary_on],
+        )
+        return stampede.fetch(
+            key, lambda: self.nodelist.render(context), timeout
+        )
+
+
+@register.tag("stampede_cache")
+def do_stampede_cache(parser, token):
+    """Аналог ``{% cache %}`` с защитой от лавины пересчетов.
+
+    {% stampede_cache timeout name [vary_on ...] %} ... {% endstampede_cache %}
+    """
+    nodelist = parser.parse(("endstampede_cache",))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' принимает хотя бы два аргумента."
+        )
+    return StampedeCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
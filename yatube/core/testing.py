@@ -0,0 +1,21 @@
+"""Помощники тестов; в рабочем коде не импортируются."""
+from urllib.parse import urlparse
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+class QueryBudgetTestMixin:
+    """Проверка бюджета запросов страниц в тестах."""
+
+    def assertWithinQueryBudget(self, client, url):
+        budget = resolve(urlparse(url).path).func.query_budget
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertLessEqual(
+            len(context),
+            budget,
+            "\n".join(query["sql"] for query in context.captured_queries),
+        )
+        return response
@@ -1,5 +1,31 @@
-from django.test import TestCase, Client
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail as outbox
+from django.core.cache import cache
+from django.core.mail import get_connection, send_mail
+from django.db import transaction
+from django.http import Http404, HttpResponse
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.utils import timezone
 from http import HTTPStatus
+from urllib.parse import quote
+
+from . import mail, media, stampede, tasks
+from .cache_backends import SQLiteCache
+from .models import OutgoingEmail, Task
+from .query_budget import (
+    QueryBudgetExceeded,
+    QueryBudgetMiddleware,
+    query_budget,
+)
 
 
 class ViewTestClass(TestCase):
@@ -14,3 +40,415 @@ class ViewTestClass(TestCase):
         """Запрос к неизвестной странице использует шаблон 404.html."""
         response = self.guest_client.get("/nonexist-page/")
         self.assertTemplateUsed(response, "core/404.html")
+
+
+class QueryBudgetMiddlewareTest(TestCase):
+    @staticmethod
+    @query_budget(1)
+    def view(request):
+        get_user_model().objects.count()
+        get_user_model().objects.count()
+        return HttpResponse()
+
+    def run_view(self):
+        request = RequestFactory().get("/")
+        middleware = QueryBudgetMiddleware(
+            lambda request: self.view(request)
+        )
+        middleware.process_view(request, self.view, (), {})
+        return middleware(request)
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_over_budget_raises(self):
+        """Превышение бюджета запросов поднимает исключение."""
+        with self.assertRaises(QueryBudgetExceeded):
+            self.run_view()
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    def test_over_budget_logs(self):
+        """Без QUERY_BUDGET_RAISE превышение бюджета пишется в лог."""
+        with self.assertLogs("core.query_budget", level="WARNING"):
+            self.run_view()
+
+
+class SQLiteCacheTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "cache.sqlite3")
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self):
+        return SQLiteCache(self.path, {})
+
+    def test_basic_operations(self):
+        """Общий кэш поддерживает основные операции Django."""
+        self.assertTrue(self.cache.add("key", {"a": 1}))
+        self.assertFalse(self.cache.add("key", "other"))
+        self.assertEqual(self.cache.get("key"), {"a": 1})
+        self.cache.set_many({"one": 1, "two": 2})
+        self.assertEqual(
+            self.cache.get_many(["one", "two", "missing"]),
+            {"one": 1, "two": 2},
+        )
+        self.assertEqual(self.cache.incr("one", 5), 6)
+        self.cache.delete("one")
+        self.assertIsNone(self.cache.get("one"))
+        with self.assertRaises(ValueError):
+            self.cache.incr("one")
+
+    def test_expired_value_is_missing(self):
+        """Просроченное значение не отдается и может быть добавлено."""
+        self.cache.set("key", "old", -1)
+        self.assertIsNone(self.cache.get("key"))
+        self.assertTrue(self.cache.add("key", "new"))
+
+    def test_shared_between_instances(self):
+        """Записи и инкременты видны другим экземплярам того же файла."""
+        other = self.make_cache()
+        self.cache.set("counter", 0)
+
+        def increment():
+            cache = self.make_cache()
+            for _ in range(50):
+                cache.incr("counter")
+
+        threads = [threading.Thread(target=increment) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(other.get("counter"), 200)
+
+
+class StampedeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def compute(self):
+        with self.calls_lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return "value"
+
+    def test_single_recompute_on_concurrent_miss(self):
+        """Одновременный промах пересчитывает значение один раз."""
+        results = []
+
+        def worker():
+            results.append(stampede.fetch("key", self.compute, 60))
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, ["value"] * 10)
+
+    def test_stale_value_while_refreshing(self):
+        """Пока значение обновляется, остальные получают устаревшее."""
+        cache.set("key", ("stale", time.time() - 1, 0.1), 60)
+        cache.add("key:lock", 1, 60)
+        self.assertEqual(stampede.fetch("key", self.compute, 60), "stale")
+        self.assertEqual(self.calls, 0)
+
+    def test_expired_lock_of_another_request_is_kept(self):
+        """Расчет, переживший свою блокировку, не снимает чужую."""
+
+        def compute():
+            cache.set("key:lock", "other", 60)
+            return "value"
+
+        self.assertEqual(stampede.fetch("key", compute, 60), "value")
+        self.assertEqual(cache.get("key:lock"), "other")
+        cache.delete("key:lock")
+        stampede.fetch("other", self.compute, 60)
+        self.assertIsNone(cache.get("other:lock"))
+
+    @override_settings(STAMPEDE_WAIT_TIMEOUT=0.1)
+    def test_waiter_computes_after_wait_timeout(self):
+        """Без устаревшего значения чужой расчет ждут недолго."""
+        cache.add("key:lock", "other", 60)
+        started = time.monotonic()
+        self.assertEqual(stampede.fetch("key", self.compute, 60), "value")
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(cache.get("key:lock"), "other")
+
+    def test_probabilistic_early_refresh(self):
+        """Близкое к истечению значение может обновиться заранее."""
+        cache.set("key", ("old", time.time() + 5, 10.0), 60)
+        with mock.patch("core.stampede.random.random", return_value=0.99):
+            self.assertEqual(stampede.fetch("key", self.compute, 60), "value")
+        with mock.patch("core.stampede.random.random", return_value=0.0):
+            self.assertEqual(stampede.fetch("key", self.compute, 60), "value")
+        self.assertEqual(self.calls, 1)
+
+    def test_template_tag(self):
+        """Тег кэширует фрагмент по имени и переменным."""
+        template = Template(
+            "{% load stampede %}"
+            "{% stampede_cache 60 fragment key %}{{ value }}"
+            "{% endstampede_cache %}"
+        )
+        first = template.render(Context({"key": 1, "value": "a"}))
+        cached = template.render(Context({"key": 1, "value": "b"}))
+        other = template.render(Context({"key": 2, "value": "c"}))
+        self.assertEqual((first, cached, other), ("a", "a", "c"))
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+HASHED = "a" * 64 + ".jpg"
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_SENDFILE=None)
+class MediaServeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.content = bytes(range(256)) * 4
+        for name in (HASHED, "plain.jpg"):
+            with open(os.path.join(MEDIA_ROOT, name), "wb") as file_:
+                file_.write(cls.content)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_full_file(self):
+        """Файл отдается целиком с заголовками кэширования."""
+        response = self.client.get(f"/media/{HASHED}")
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertEqual(response["Content-Length"], str(len(self.content)))
+        self.assertIn("immutable", response["Cache-Control"])
+        plain = self.client.get("/media/plain.jpg")
+        self.assertNotIn("immutable", plain["Cache-Control"])
+
+    def test_range(self):
+        """Запрос с Range получает нужный кусок файла."""
+        size = len(self.content)
+        cases = {
+            "bytes=10-19": (10, 20),
+            "bytes=1000-": (1000, size),
+            "bytes=-24": (size - 24, size),
+            "bytes=1000-5000": (1000, size),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(
+                    f"/media/{HASHED}", HTTP_RANGE=header
+                )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.PARTIAL_CONTENT
+                )
+                self.assertEqual(
+                    b"".join(response.streaming_content),
+                    self.content[start:end],
+                )
+                self.assertEqual(
+                    response["Content-Range"],
+                    f"bytes {start}-{end - 1}/{size}",
+                )
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(
+            f"/media/{HASHED}", HTTP_RANGE="bytes=5000-"
+        )
+        self.assertEqual(
+            response.status_code, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(
+            response["Content-Range"], f"bytes */{len(self.content)}"
+        )
+
+    def test_stale_if_range_returns_full_file(self):
+        response = self.client.get(
+            f"/media/{HASHED}", HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_if_none_match(self):
+        """Повторный запрос с ETag получает 304 без тела."""
+        etag = self.client.get(f"/media/{HASHED}")["ETag"]
+        response = self.client.get(
+            f"/media/{HASHED}", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_if_modified_since_revalidation(self):
+        """Возвращенный клиентом ``Last-Modified`` дает 304 и без ETag."""
+        path = os.path.join(MEDIA_ROOT, "plain.jpg")
+        os.utime(path, (1_600_000_000.75, 1_600_000_000.75))
+        last_modified = self.client.get("/media/plain.jpg")["Last-Modified"]
+        response = self.client.get(
+            "/media/plain.jpg", HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_sendfile(self):
+        """В режиме sendfile тело отдает веб-сервер."""
+        with self.settings(MEDIA_SENDFILE="X-Sendfile"):
+            response = self.client.get(f"/media/{HASHED}")
+        self.assertEqual(
+            response["X-Sendfile"], os.path.join(MEDIA_ROOT, HASHED)
+        )
+        self.assertEqual(response.content, b"")
+        with self.settings(MEDIA_SENDFILE="X-Accel-Redirect"):
+            response = self.client.get(f"/media/{HASHED}")
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media/{HASHED}"
+        )
+
+    def test_sendfile_quotes_name_and_guesses_type(self):
+        name = "фото #1.raw1"
+        with open(os.path.join(MEDIA_ROOT, name), "wb") as file_:
+            file_.write(self.content)
+        with self.settings(MEDIA_SENDFILE="X-Accel-Redirect"):
+            response = self.client.get(f"/media/{quote(name)}")
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected-media/%D1%84%D0%BE%D1%82%D0%BE%20%231.raw1",
+        )
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+
+    def test_outside_media_root(self):
+        for path in ("../settings.py", "missing.jpg", ""):
+            with self.subTest(path=path):
+                with self.assertRaises(Http404):
+                    media.serve(RequestFactory().get("/"), path)
+
+
+calls = []
+
+
+@tasks.task
+def record(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def broken():
+    raise RuntimeError("сбой")
+
+
+@override_settings(TASKS_RETRY_BACKOFF=10, TASKS_VISIBILITY_TIMEOUT=60)
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_and_run(self):
+        """Задача пишется в базу и выполняется воркером один раз."""
+        record.delay("a")
+        record.delay(value="b")
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(tasks.run_pending(), 2)
+        self.assertCountEqual(calls, ["a", "b"])
+        self.assertFalse(Task.objects.exists())
+
+    def test_rollback_drops_task(self):
+        """Задача из откаченной транзакции не выполняется."""
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                record.delay("a")
+                raise ValueError
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_with_backoff_then_fail(self):
+        """Ошибка откладывает повтор, после лимита задача помечается."""
+        broken.delay()
+        started = timezone.now()
+        with self.assertLogs("core.tasks", "ERROR"):
+            self.assertEqual(tasks.run_pending(), 1)
+        job = Task.objects.get()
+        self.assertEqual((job.status, job.attempts), (Task.QUEUED, 1))
+        self.assertGreaterEqual(job.run_at, started + timedelta(seconds=10))
+        self.assertIn("RuntimeError", job.last_error)
+        self.assertEqual(tasks.run_pending(), 0)
+        Task.objects.update(run_at=started)
+        with self.assertLogs("core.tasks", "ERROR"):
+            tasks.run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.FAILED, 2))
+
+    def test_backoff_is_capped(self):
+        with self.settings(TASKS_RETRY_BACKOFF_MAX=30):
+            self.assertEqual(
+                [tasks.backoff(n) for n in (1, 2, 3)], [10, 20, 30]
+            )
+
+    def test_visibility_timeout(self):
+        """Захваченная задача скрыта, пока не истечет таймаут."""
+        record.delay("a")
+        job = tasks.claim()
+        self.assertIsNotNone(job)
+        self.assertIsNone(tasks.claim())
+        Task.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        again = tasks.claim()
+        self.assertEqual((again.pk, again.attempts), (job.pk, 2))
+
+    def test_worker_loop_drains_queue(self):
+        for value in range(3):
+            record.delay(value)
+        tasks.work(threading.Event(), poll_interval=0, once=True)
+        self.assertEqual(sorted(calls), [0, 1, 2])
+
+
+@override_settings(
+    EMAIL_BACKEND="core.mail.QueuedEmailBackend",
+    QUEUED_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    EMAIL_BATCH_SIZE=2,
+)
+class QueuedEmailTest(TestCase):
+    def send(self, count):
+        for number in range(count):
+            send_mail(f"Тема {number}", "Текст", None, ["to@example.com"])
+
+    def test_queue_depth(self):
+        self.send(3)
+        self.assertEqual(len(outbox.outbox), 0)
+        self.assertEqual(mail.depth()["emails"], 3)
+        # Одна ждущая задача отправит все письма.
+        self.assertEqual(tasks.depth()[mail.flush.task_name]["ready"], 1)
+
+    def test_batches_share_connection(self):
+        """Письма уходят пачками, по одному соединению на пачку."""
+        self.send(5)
+        with mock.patch(
+            "core.mail.get_connection", wraps=get_connection
+        ) as connect:
+            tasks.run_pending()
+        self.assertEqual(connect.call_count, 3)
+        self.assertEqual(len(outbox.outbox), 5)
+        self.assertEqual(
+            sorted(message.subject for message in outbox.outbox),
+            [f"Тема {number}" for number in range(5)],
+        )
+        self.assertFalse(OutgoingEmail.objects.exists())
+        self.assertEqual(mail.depth(), {"emails": 0, "oldest_age": 0})
+
+    def test_failure_mid_batch_does_not_resend(self):
+        """Ошибка на письме не отправляет повторно уже ушедшие."""
+        self.send(2)
+        with mock.patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=[1, OSError("SMTP")],
+        ):
+            with self.assertRaises(OSError):
+                mail.flush()
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        OutgoingEmail.objects.update(claimed_until=None)
+        self.assertEqual(mail.flush(), 1)
+        self.assertEqual(
+            [message.subject for message in outbox.outbox], ["Тема 1"]
+        )
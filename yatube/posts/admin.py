@@ -1,6 +1,35 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.auth.admin import UserAdmin
 
-from .models import Post, Group
+from . import autocomplete, search
+from .models import Post, Group, User
+
+
+class IndexedAutocompleteJsonView(AutocompleteJsonView):
+    """Подсказки виджета ``autocomplete_fields`` по индексу автодополнения.
+
+    Обычный поиск списка объектов остается на ``search_fields``.
+    """
+
+    def get_queryset(self):
+        queryset = self.model_admin.get_queryset(self.request)
+        if not self.term.strip():
+            return queryset
+        items = autocomplete.lookup(
+            self.term,
+            (self.model_admin.autocomplete_kind,),
+            settings.AUTOCOMPLETE_ADMIN_LIMIT,
+        )
+        return queryset.filter(pk__in=[item.pk for item in items])
+
+
+class IndexedAutocompleteMixin:
+    autocomplete_kind = None
+
+    def autocomplete_view(self, request):
+        return IndexedAutocompleteJsonView.as_view(model_admin=self)(request)
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -14,17 +43,33 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ("text",)
     list_filter = ("pub_date",)
     list_editable = ("group",)
+    autocomplete_fields = ("author", "group")
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу FTS5 вместо ``LIKE '%...%'`` по всей таблице."""
+        query = search.match_query(search_term)
+        if not query:
+            return queryset, False
+        return queryset.filter(search_index__text__match=query), False
+
 
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(IndexedAutocompleteMixin, admin.ModelAdmin):
     list_display = (
         "title",
         "slug",
         "description",
     )
+    search_fields = ("title", "slug")
+    autocomplete_kind = autocomplete.GROUP
     prepopulated_fields = {"slug": ("title",)}
 
 
+class IndexedUserAdmin(IndexedAutocompleteMixin, UserAdmin):
+    autocomplete_kind = autocomplete.USER
+
+
+admin.site.unregister(User)
+admin.site.register(User, IndexedUserAdmin)
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
@@ -0,0 +1,284 @@
+"""JSON API лент, постов и комментариев для мобильного клиента.
+
+Ленты и комментарии отдаются страницами курсорного паджинатора, что и
+HTML-страницы: в ответе ``results`` и ссылки ``next``/``previous``.
+Ленты, пост и комментарии используют те же валидаторы условного GET, что
+и страницы сайта; для ленты подписок ``ETag`` считается по телу ответа.
+Batch-запросы отдают посты и пользователей по списку id за один ответ.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, set_response_etag
+from django.views.decorators.http import require_safe
+
+from core.query_budget import query_budget
+
+from . import feed_cache, serializers, timeline
+from .conditional import (
+    group_condition,
+    index_condition,
+    post_condition,
+    profile_condition,
+)
+from .models import Comment, Group, Post, User
+from .paginators import CursorPaginator, request_page
+
+JSON_DUMPS_PARAMS = {"ensure_ascii": False, "separators": (",", ":")}
+NOT_FOUND = "not_found"
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params=JSON_DUMPS_PARAMS
+    )
+
+
+def _error(status, detail):
+    return _json({"detail": detail}, status)
+
+
+def _plan(request, serializer):
+    return serializer.plan(
+        serializers.parse_fields(request.GET.get("fields"))
+    )
+
+
+def api_view(view_func):
+    """Только GET/HEAD; неизвестное поле в ``?fields=`` дает 400."""
+
+    @require_safe
+    @wraps(view_func)
+    def wrapped(request, *args, **kwargs):
+        try:
+            return view_func(request, *args, **kwargs)
+        except serializers.FieldError as error:
+            return _error(400, f"Неизвестное поле: {error}")
+
+    return wrapped
+
+
+def content_condition(view_func):
+    """Условный GET по ``ETag`` из тела ответа."""
+
+    @wraps(view_func)
+    def wrapped(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        set_response_etag(response)
+        return get_conditional_response(
+            request, etag=response["ETag"], response=response
+        )
+
+    return wrapped
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query.pop("page", None)
+    query["cursor"] = cursor
+    return f"{request.path}?{query.urlencode()}"
+
+
+def _page(request, paginator, plan):
+    page_obj = request_page(request, paginator)
+    return _json(
+        {
+            "results": [
+                serializers.serialize(plan, item) for item in page_obj
+            ],
+            "next": _link(request, paginator.next_cursor),
+            "previous": _link(request, paginator.previous_cursor),
+        }
+    )
+
+
+def _feed(request, queryset):
+    plan = _plan(request, serializers.posts)
+    posts = serializers.apply(queryset, plan, "pub_date")
+    return _page(
+        request, CursorPaginator(posts, settings.PER_PAGE_COUNT), plan
+    )
+
+
+@query_budget(2)
+@api_view
+@index_condition
+def index(request):
+    return _feed(request, Post.objects.all())
+
+
+@query_budget(3)
+@api_view
+@group_condition
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).only("pk").first()
+    if group is None:
+        return _error(404, "Группа не найдена.")
+    return _feed(request, Post.objects.filter(group=group))
+
+
+@query_budget(3)
+@api_view
+@profile_condition
+def profile(request, username):
+    author = User.objects.filter(username=username).only("pk").first()
+    if author is None:
+        return _error(404, "Автор не найден.")
+    return _feed(request, Post.objects.filter(author=author))
+
+
+@query_budget(6)
+@api_view
+@content_condition
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return _error(401, "Нужна авторизация.")
+    plan = _plan(request, serializers.posts)
+    paginator = timeline.follow_paginator(
+        request.user, settings.PER_PAGE_COUNT
+    )
+    for source in getattr(paginator, "sources", [paginator]):
+        source.object_list = serializers.apply(
+            source.object_list, plan, "pub_date"
+        )
+    return _page(request, paginator, plan)
+
+
+@query_budget(2)
+@api_view
+@post_condition
+def post_detail(request, post_id):
+    plan = _plan(request, serializers.posts)
+    post = (
+        serializers.apply(Post.objects.all(), plan).filter(pk=post_id).first()
+    )
+    if post is None:
+        return _error(404, "Пост не найден.")
+    return _json(serializers.serialize(plan, post))
+
+
+@query_budget(3)
+@api_view
+@post_condition
+def post_comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return _error(404, "Пост не найден.")
+    plan = _plan(request, serializers.comments)
+    comments = serializers.apply(
+        Comment.objects.filter(post_id=post_id), plan, "created"
+    )
+    return _page(
+        request,
+        CursorPaginator(
+            comments, settings.PER_PAGE_COUNT, date_field="created"
+        ),
+        plan,
+    )
+
+
+def _ids(request):
+    """Список id из ``?ids=1,2,3`` или None, если он пуст или некорректен."""
+    try:
+        ids = [
+            int(value)
+            for value in request.GET.get("ids", "").split(",")
+            if value.strip()
+        ]
+    except ValueError:
+        return None
+    if not 0 < len(ids) <= settings.API_BATCH_MAX_IDS:
+        return None
+    return ids
+
+
+def _batch(ids, found):
+    """Ответ в порядке запроса; ненайденные id помечаются ``not_found``."""
+    return _json(
+        {
+            "results": [
+                found[pk] if pk in found else {"id": pk, "error": NOT_FOUND}
+                for pk in ids
+            ]
+        }
+    )
+
+
+def _bad_ids():
+    return _error(
+        400,
+        f"Нужно от 1 до {settings.API_BATCH_MAX_IDS} id через запятую.",
+    )
+
+
+def _card_keys(rows, fields):
+    """Ключи карточек по поколениям поста, его автора и группы."""
+    scopes = {
+        pk: feed_cache.card_scopes(pk, author_id, group_id)
+        for pk, author_id, group_id in rows
+    }
+    current = feed_cache.versions(
+        {scope for post_scopes in scopes.values() for scope in post_scopes}
+    )
+    digest = hashlib.md5(fields.encode()).hexdigest()
+    return {
+        pk: "api_post:{}:{}:{}".format(
+            pk,
+            ":".join(str(current[scope]) for scope in post_scopes),
+            digest,
+        )
+        for pk, post_scopes in scopes.items()
+    }
+
+
+@query_budget(2)
+@api_view
+def posts_batch(request):
+    """Посты по списку id: из кэша карточек, недостающие одним ``in_bulk``.
+
+    Ключ карточки включает поколения поста (правки и комментарии), имени
+    автора и названия группы, поэтому для проверки кэша достаточно одного
+    запроса к базе.
+    """
+    ids = _ids(request)
+    if ids is None:
+        return _bad_ids()
+    fields = request.GET.get("fields", "")
+    plan = _plan(request, serializers.posts)
+    keys = _card_keys(
+        Post.objects.filter(pk__in=ids).values_list(
+            "pk", "author_id", "group_id"
+        ),
+        fields,
+    )
+    cached = cache.get_many(keys.values())
+    found = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in keys if pk not in found]
+    if missing:
+        posts = serializers.apply(Post.objects.all(), plan)
+        fresh = {}
+        for pk, post in posts.in_bulk(missing).items():
+            found[pk] = serializers.serialize(plan, post)
+            fresh[keys[pk]] = found[pk]
+        cache.set_many(fresh, settings.POST_CARD_CACHE_TIMEOUT)
+    return _batch(ids, found)
+
+
+@query_budget(1)
+@api_view
+def users_batch(request):
+    ids = _ids(request)
+    if ids is None:
+        return _bad_ids()
+    plan = _plan(request, serializers.users)
+    users = serializers.apply(User.objects.all(), plan).in_bulk(ids)
+    return _batch(
+        ids,
+        {pk: serializers.serialize(plan, user) for pk, user in users.items()},
+    )
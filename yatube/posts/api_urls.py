@@ -0,0 +1,20 @@
+from django.urls import path
+
+from . import api
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", api.index, name="index"),
+    path("posts/batch/", api.posts_batch, name="posts_batch"),
+    path("users/batch/", api.users_batch, name="users_batch"),
+    path("posts/<int:post_id>/", api.post_detail, name="post_detail"),
+    path(
+        "posts/<int:post_id>/comments/",
+        api.post_comments,
+        name="post_comments",
+    ),
+    path("groups/<slug:slug>/posts/", api.group_posts, name="group_posts"),
+    path("users/<str:username>/posts/", api.profile, name="profile"),
+    path("follow/", api.follow_index, name="follow_index"),
+]
@@ -0,0 +1,336 @@
+"""Автодополнение групп и авторов по индексу в памяти процесса.
+
+Индекс хранит нормализованные строки (название и slug группы; username,
+имя и фамилию автора) в отсортированном списке, где префикс ищется
+двоичным поиском, и в словаре триграмм для поиска с опечатками. Он
+строится из базы при первом запросе, а дальше обновляется по сигналам
+сохранения и удаления. Изменения из других процессов приходят через
+журнал в общем кэше: каждое изменение получает номер и хранит пару
+(вид, id), а процесс перечитывает такие записи из базы перед поиском.
+Если журнал прерван (записи вытеснены или их слишком много), индекс
+строится заново.
+"""
+import bisect
+import threading
+import unicodedata
+from collections import Counter, namedtuple
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.urls import reverse
+
+from .models import Group, User
+
+GROUP = "group"
+USER = "user"
+KINDS = (GROUP, USER)
+VERSION_KEY = "autocomplete:version"
+EMPTY = frozenset()
+
+Item = namedtuple("Item", "kind pk label value")
+
+
+def normalize(text):
+    """Строка без регистра, диакритики и лишних пробелов."""
+    text = text.casefold()
+    # Обычно разлагать нечего, и посимвольный проход не нужен.
+    if not unicodedata.is_normalized("NFKD", text):
+        text = "".join(
+            char
+            for char in unicodedata.normalize("NFKD", text)
+            if not unicodedata.combining(char)
+        )
+    return " ".join(text.split())
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[i: i + 3] for i in range(len(padded) - 2)}
+
+
+def _terms(*values):
+    """Строки для поиска по префиксу: значение и его хвосты с каждого слова.
+
+    Так «Иван Петров» находится и по «пет».
+    """
+    terms = set()
+    for value in values:
+        words = normalize(value).split()
+        for start in range(len(words)):
+            terms.add(" ".join(words[start:]))
+    return frozenset(terms)
+
+
+def group_entry(pk, title, slug):
+    return Item(GROUP, pk, title, slug), _terms(title, slug)
+
+
+def user_entry(pk, username, first_name, last_name):
+    full_name = f"{first_name} {last_name}".strip()
+    return (
+        Item(USER, pk, full_name or username, username),
+        _terms(username, full_name),
+    )
+
+
+def _group_entries(groups):
+    for row in groups.values_list("pk", "title", "slug").iterator():
+        yield group_entry(*row)
+
+
+def _user_entries(users):
+    for row in users.values_list(
+        "pk", "username", "first_name", "last_name"
+    ).iterator():
+        yield user_entry(*row)
+
+
+class Index:
+    """Префиксный и триграммный индекс записей ``Item``."""
+
+    def __init__(self, entries=(), version=None):
+        self.items = {}
+        self.terms = {}
+        self.prefixes = []
+        self.trigrams = {}
+        self.version = version
+        self.lock = threading.Lock()
+        # При построении строки дописываются в конец и сортируются один
+        # раз, при обновлении вставляются на место.
+        for item, terms in entries:
+            self._store(item, terms, list.append)
+        self.prefixes.sort()
+
+    def _store(self, item, terms, insert):
+        key = (item.kind, item.pk)
+        self.items[key] = item
+        self.terms[key] = terms
+        for term in terms:
+            insert(self.prefixes, (term, key))
+        for gram in set().union(*map(trigrams, terms)):
+            self.trigrams.setdefault(gram, set()).add(key)
+
+    def _remove(self, key):
+        terms = self.terms.pop(key, None)
+        if terms is None:
+            return
+        del self.items[key]
+        for term in terms:
+            del self.prefixes[bisect.bisect_left(self.prefixes, (term, key))]
+        for gram in set().union(*map(trigrams, terms)):
+            posting = self.trigrams[gram]
+            posting.discard(key)
+            if not posting:
+                del self.trigrams[gram]
+
+    def update(self, item, terms):
+        with self.lock:
+            key = (item.kind, item.pk)
+            if self.items.get(key) == item:
+                return
+            self._remove(key)
+            self._store(item, terms, bisect.insort)
+
+    def remove(self, kind, pk):
+        with self.lock:
+            self._remove((kind, pk))
+
+    def _prefix(self, query, kinds, limit):
+        found = []
+        scanned = 0
+        position = bisect.bisect_left(self.prefixes, (query,))
+        while (
+            position < len(self.prefixes)
+            and len(found) < limit
+            and scanned < settings.AUTOCOMPLETE_MAX_CANDIDATES
+        ):
+            term, key = self.prefixes[position]
+            if not term.startswith(query):
+                break
+            if key[0] in kinds and key not in found:
+                found.append(key)
+            position += 1
+            scanned += 1
+        return found
+
+    def _fuzzy(self, query, kinds, limit, exclude):
+        """Записи, где совпадает хотя бы половина триграмм запроса.
+
+        Такая запись обязательно есть в одном из ``len - need + 1`` самых
+        коротких списков, поэтому длинные списки частых триграмм
+        просматриваются только для подсчета совпадений.
+        """
+        grams = trigrams(query)
+        need = max(1, -(-len(grams) // 2))
+        postings = sorted(
+            (self.trigrams.get(gram, EMPTY) for gram in grams), key=len
+        )
+        candidates = set()
+        for posting in postings[: len(grams) - need + 1]:
+            for key in posting:
+                if len(candidates) >= settings.AUTOCOMPLETE_MAX_CANDIDATES:
+                    break
+                if key[0] in kinds and key not in exclude:
+                    candidates.add(key)
+        overlaps = Counter()
+        for posting in postings:
+            overlaps.update(candidates.intersection(posting))
+        scored = sorted(
+            (-overlap, len(self.items[key].label), key)
+            for key, overlap in overlaps.items()
+            if overlap >= need
+        )
+        return [key for _, _, key in scored[:limit]]
+
+    def lookup(self, query, kinds=KINDS, limit=None):
+        """Записи по префиксу, затем похожие по триграммам."""
+        limit = limit or settings.AUTOCOMPLETE_LIMIT
+        query = normalize(query)
+        if not query:
+            return []
+        with self.lock:
+            keys = self._prefix(query, kinds, limit)
+            if len(keys) < limit and len(query) >= 3:
+                keys += self._fuzzy(query, kinds, limit - len(keys), keys)
+            return [self.items[key] for key in keys]
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def _shared_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 0, None)
+        version = cache.get(VERSION_KEY, 0)
+    return version
+
+
+def _change_key(version):
+    return f"autocomplete:change:{version}"
+
+
+def _build():
+    version = _shared_version()
+    return Index(
+        chain(
+            _group_entries(Group.objects.all()),
+            _user_entries(User.objects.all()),
+        ),
+        version,
+    )
+
+
+def _reload(index, kind, pks):
+    if kind == GROUP:
+        entries = _group_entries(Group.objects.filter(pk__in=pks))
+    else:
+        entries = _user_entries(User.objects.filter(pk__in=pks))
+    missing = set(pks)
+    for item, terms in entries:
+        index.update(item, terms)
+        missing.discard(item.pk)
+    for pk in missing:
+        index.remove(kind, pk)
+
+
+def _catch_up(index):
+    """Применяет изменения других процессов из журнала в кэше."""
+    version = _shared_version()
+    if version == index.version:
+        return index
+    versions = range(index.version + 1, version + 1)
+    if not 0 < len(versions) <= settings.AUTOCOMPLETE_MAX_CHANGES:
+        return _build()
+    changes = cache.get_many([_change_key(number) for number in versions])
+    if len(changes) != len(versions):
+        return _build()
+    pks = {kind: set() for kind in KINDS}
+    for kind, pk in changes.values():
+        pks[kind].add(pk)
+    for kind, kind_pks in pks.items():
+        if kind_pks:
+            _reload(index, kind, kind_pks)
+    index.version = version
+    return index
+
+
+def get_index():
+    """Индекс процесса, догнавший журнал изменений."""
+    global _index
+    with _build_lock:
+        _index = _build() if _index is None else _catch_up(_index)
+        return _index
+
+
+def _warm():
+    try:
+        get_index()
+    finally:
+        connection.close()
+
+
+def warm_up():
+    """Строит индекс в фоне, чтобы его не ждал первый запрос.
+
+    На миллионе пользователей построение занимает около минуты.
+    """
+    threading.Thread(target=_warm, name="autocomplete", daemon=True).start()
+
+
+def reset():
+    """Забывает индекс процесса; следующий поиск построит его заново."""
+    global _index
+    with _build_lock:
+        _index = None
+
+
+def lookup(query, kinds=KINDS, limit=None):
+    return get_index().lookup(query, kinds, limit)
+
+
+def _apply(kind, pk, entry):
+    """Применяет изменение к индексу процесса и пишет его в журнал."""
+    index = _index
+    if index is not None:
+        if entry is None:
+            index.remove(kind, pk)
+        else:
+            index.update(*entry)
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 0, None)
+        version = cache.incr(VERSION_KEY)
+    cache.set(
+        _change_key(version), (kind, pk), settings.AUTOCOMPLETE_CHANGE_TIMEOUT
+    )
+    if index is not None and index.version == version - 1:
+        # Свое изменение индекс процесса уже применил.
+        index.version = version
+
+
+def changed(kind, pk, entry=None):
+    """Обновляет индекс процесса и журнал после коммита изменения.
+
+    До коммита другой процесс перечитал бы запись раньше, чем она станет
+    видна, а откат оставил бы в индексе процесса несуществующую запись.
+    """
+    transaction.on_commit(lambda: _apply(kind, pk, entry))
+
+
+def as_json(item):
+    if item.kind == GROUP:
+        url = reverse("posts:group_posts", kwargs={"slug": item.value})
+    else:
+        url = reverse("posts:profile", kwargs={"username": item.value})
+    return {
+        "type": item.kind,
+        "id": item.pk,
+        "label": item.label,
+        "value": item.value,
+        "url": url,
+    }
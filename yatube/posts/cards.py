@@ -0,0 +1,55 @@
+"""Кэш отрисованных карточек постов, общий для всех лент.
+
+Ключ карточки включает поколения поста, имени автора и названия группы
+(``feed_cache.card_scopes``): правка поста, в том числе смена группы в
+админке, дает новый ключ только этой карточке, правка автора или группы —
+их карточкам, а старые доживают свой TTL, никому не отдаваясь.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import feed_cache, thumbnails
+
+TEMPLATE = "posts/includes/post_card.html"
+
+
+def card_keys(posts):
+    """Ключи карточек; поколения всех областей читаются одним ``get_many``."""
+    scopes = [
+        feed_cache.card_scopes(post.pk, post.author_id, post.group_id)
+        for post in posts
+    ]
+    versions = feed_cache.versions(
+        {scope for post_scopes in scopes for scope in post_scopes}
+    )
+    return [
+        "post_card:{}:{}".format(
+            post.pk, ":".join(str(versions[scope]) for scope in post_scopes)
+        )
+        for post, post_scopes in zip(posts, scopes)
+    ]
+
+
+def render(posts):
+    """Карточки постов: выборка ``get_many``, недостающие рисуются.
+
+    Миниатюры для недостающих карточек тоже ищутся одной выборкой.
+    """
+    posts = list(posts)
+    keys = card_keys(posts)
+    cached = cache.get_many(keys)
+    thumbnails.attach(
+        [post for post, key in zip(posts, keys) if key not in cached]
+    )
+    missing = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = missing[key] = render_to_string(TEMPLATE, {"post": post})
+        cards.append(mark_safe(card))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+    return cards
@@ -0,0 +1,193 @@
+"""Валидаторы условных GET-запросов для лент и страницы поста.
+
+``ETag`` учитывает самую свежую дату области (публикации поста или, на
+странице поста, комментария), поколение кэша области (меняется при правке
+и удалении постов, а также при правке показанных в ней авторов и групп),
+счетчики, показанные на странице, и зрителя: шапка и вкладки
+``switcher.html`` зависят от пользователя, а кнопка подписки — еще и от
+подписки на автора. Он считается одним запросом и запоминается на
+``request``. ``Last-Modified`` не отдается: дата не меняется при правках,
+удалениях, подписках и смене зрителя, и ``If-Modified-Since`` давал бы
+ложные 304.
+
+Ответы анонимам целиком кладутся в кэш по адресу и ``ETag``: любая запись,
+меняющая валидаторы, тем самым меняет и ключ страницы.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from . import feed_cache
+from .models import Comment, Follow, Group, Post, User
+
+
+def _viewer(request):
+    if request.user.is_authenticated:
+        return request.user.pk
+    return "anonymous"
+
+
+def _etag(request, scope, latest, *parts):
+    return hashlib.md5(
+        "|".join(
+            str(part)
+            for part in (
+                _viewer(request),
+                request.GET.urlencode(),
+                feed_cache.version(scope),
+                latest,
+            )
+            + parts
+        ).encode()
+    ).hexdigest()
+
+
+def _newest(queryset, field):
+    """Подзапрос самой свежей даты; идет по индексу, без GROUP BY."""
+    return Subquery(queryset.order_by(f"-{field}").values(field)[:1])
+
+
+def _index(request):
+    latest = (
+        Post.objects.order_by("-pub_date", "-id")
+        .values_list("pub_date", flat=True)
+        .first()
+    )
+    return _etag(request, feed_cache.INDEX, latest)
+
+
+def _group(request, slug):
+    group = (
+        Group.objects.filter(slug=slug)
+        .annotate(
+            latest=_newest(
+                Post.objects.filter(group=OuterRef("pk")), "pub_date"
+            )
+        )
+        .values("pk", "latest")
+        .first()
+    )
+    if group is None:
+        return None
+    return _etag(
+        request, feed_cache.group_scope(group["pk"]), group["latest"]
+    )
+
+
+def _profile(request, username):
+    authors = User.objects.filter(username=username).annotate(
+        latest=_newest(Post.objects.filter(author=OuterRef("pk")), "pub_date")
+    )
+    if request.user.is_authenticated:
+        authors = authors.annotate(
+            is_following=Exists(
+                Follow.objects.filter(user=request.user, author=OuterRef("pk"))
+            )
+        )
+    author = authors.values(
+        "pk",
+        "latest",
+        "stats__posts_count",
+        "stats__followers_count",
+        "stats__following_count",
+        *(["is_following"] if request.user.is_authenticated else []),
+    ).first()
+    if author is None:
+        return None
+    return _etag(
+        request,
+        feed_cache.author_scope(author["pk"]),
+        author["latest"],
+        author["stats__posts_count"],
+        author["stats__followers_count"],
+        author["stats__following_count"],
+        author.get("is_following"),
+    )
+
+
+def _post(request, post_id):
+    post = (
+        Post.objects.filter(pk=post_id)
+        .annotate(
+            latest_comment=_newest(
+                Comment.objects.filter(post=OuterRef("pk")), "created"
+            )
+        )
+        .values(
+            "author_id",
+            "group_id",
+            "pub_date",
+            "latest_comment",
+            "comments_count",
+            "author__stats__posts_count",
+        )
+        .first()
+    )
+    if post is None:
+        return None
+    latest = max(filter(None, (post["pub_date"], post["latest_comment"])))
+    return _etag(
+        request,
+        feed_cache.post_scope(post_id),
+        latest,
+        post["comments_count"],
+        post["author__stats__posts_count"],
+        # Правки автора и группы, показанных на странице поста.
+        feed_cache.version(feed_cache.author_scope(post["author_id"])),
+        post["group_id"]
+        and feed_cache.version(feed_cache.group_scope(post["group_id"])),
+    )
+
+
+def _cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_USED")
+    )
+
+
+def _conditional(compute):
+    """Условный GET и кэш страниц анонимов по ``ETag`` из ``compute``."""
+
+    def etag(request, *args, **kwargs):
+        if not hasattr(request, "_etag"):
+            request._etag = compute(request, *args, **kwargs)
+        return request._etag
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def cached_view(request, *args, **kwargs):
+            value = etag(request, *args, **kwargs)
+            if (
+                request.user.is_authenticated
+                or request.method not in ("GET", "HEAD")
+                or not value
+            ):
+                return view_func(request, *args, **kwargs)
+            key = "anonymous_page:{}:{}".format(
+                hashlib.md5(request.get_full_path().encode()).hexdigest(),
+                value,
+            )
+            response = cache.get(key)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+                if _cacheable(request, response):
+                    cache.set(
+                        key, response, settings.ANONYMOUS_PAGE_CACHE_TIMEOUT
+                    )
+            return response
+
+        return condition(etag_func=etag)(cached_view)
+
+    return decorator
+
+
+index_condition = _conditional(_index)
+group_condition = _conditional(_group)
+profile_condition = _conditional(_profile)
+post_condition = _conditional(_post)
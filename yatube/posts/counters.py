@@ -0,0 +1,121 @@
+"""Денормализованные счетчики постов, комментариев и подписок.
+
+Счетчики меняются атомарно через ``F()`` из сигналов сохранения и
+удаления; расхождения исправляет команда ``reconcile_counters`` сразу
+или фоновой задачей.
+"""
+from django.db.models import Count, F
+
+from core.tasks import task
+
+from .models import Follow, Post, User, UserStats
+
+
+def _actual(user_id):
+    return {
+        "posts_count": Post.objects.filter(author_id=user_id).count(),
+        "followers_count": Follow.objects.filter(author_id=user_id).count(),
+        "following_count": Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def stats_for(user_id):
+    """Счетчики пользователя; отсутствующая строка считается по базе."""
+    try:
+        return UserStats.objects.get(user_id=user_id)
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user_id, defaults=_actual(user_id)
+        )
+        return stats
+
+
+def create_stats(user_id):
+    """Нулевые счетчики нового пользователя, чтобы чтение их не писало."""
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=user_id)], ignore_conflicts=True
+    )
+
+
+def bump_user(user_id, field, delta):
+    """Сдвигает счетчик пользователя, не опуская его ниже нуля."""
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f"{field}__gte": -delta})
+    if not stats.update(**{field: F(field) + delta}) and delta > 0:
+        stats_for(user_id)
+
+
+def bump_comments(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        posts = posts.filter(comments_count__gte=-delta)
+    posts.update(comments_count=F("comments_count") + delta)
+
+
+def _grouped(queryset, field):
+    return dict(
+        queryset.order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values_list(field, "total")
+    )
+
+
+@task
+def reconcile(batch_size=1000):
+    """Пересчитывает все счетчики; возвращает число исправленных строк."""
+    fixed = 0
+    user_ids = User.objects.order_by("pk").values_list("pk", flat=True)
+    last_pk = 0
+    while True:
+        chunk = list(user_ids.filter(pk__gt=last_pk)[:batch_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1]
+        posts = _grouped(Post.objects.filter(author_id__in=chunk), "author_id")
+        followers = _grouped(
+            Follow.objects.filter(author_id__in=chunk), "author_id"
+        )
+        following = _grouped(
+            Follow.objects.filter(user_id__in=chunk), "user_id"
+        )
+        existing = UserStats.objects.in_bulk(chunk)
+        changed = []
+        for user_id in chunk:
+            stats = existing.get(user_id) or UserStats(user_id=user_id)
+            actual = (
+                posts.get(user_id, 0),
+                followers.get(user_id, 0),
+                following.get(user_id, 0),
+            )
+            current = (
+                stats.posts_count,
+                stats.followers_count,
+                stats.following_count,
+            )
+            if user_id in existing and actual == current:
+                continue
+            (
+                stats.posts_count,
+                stats.followers_count,
+                stats.following_count,
+            ) = actual
+            changed.append(stats)
+        UserStats.objects.bulk_create(
+            [stats for stats in changed if stats.user_id not in existing]
+        )
+        UserStats.objects.bulk_update(
+            [stats for stats in changed if stats.user_id in existing],
+            ["posts_count", "followers_count", "following_count"],
+        )
+        fixed += len(changed)
+    drifted = (
+        Post.objects.annotate(actual=Count("comments"))
+        .exclude(comments_count=F("actual"))
+        .values_list("pk", "actual")
+    )
+    for post_id, actual in list(drifted):
+        Post.objects.filter(pk=post_id).update(comments_count=actual)
+        fixed += 1
+    return fixed
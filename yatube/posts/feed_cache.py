@@ -0,0 +1,159 @@
+"""Версии кэша лент.
+
+У каждой области (вся лента, группа, автор) есть счетчик-поколение.
+Ключи фрагментов включают его, поэтому запись поста просто увеличивает
+счетчик, а старые фрагменты доживают свой TTL, никому не отдаваясь.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import stampede
+
+from .models import Comment, Post
+from .paginators import CursorPaginator, request_page
+
+INDEX = "index"
+
+
+def group_scope(group_id):
+    return f"group:{group_id}"
+
+
+def author_scope(author_id):
+    return f"author:{author_id}"
+
+
+def post_scope(post_id):
+    return f"post:{post_id}"
+
+
+def user_scope(user_id):
+    """Имя и адрес пользователя; меняется только при их правке."""
+    return f"user:{user_id}"
+
+
+def group_info_scope(group_id):
+    """Название и адрес группы; меняется только при их правке."""
+    return f"group_info:{group_id}"
+
+
+def card_scopes(post_id, author_id, group_id):
+    """Области, правка в которых меняет карточку поста.
+
+    Поколения автора и группы в лентах меняются с каждым их постом, поэтому
+    карточка зависит от отдельных областей их имени и названия.
+    """
+    scopes = [post_scope(post_id), user_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_info_scope(group_id))
+    return scopes
+
+
+def _key(scope):
+    return f"feed_version:{scope}"
+
+
+def version(scope):
+    """Текущее поколение области; новое начинается с метки времени."""
+    key = _key(scope)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def versions(scopes):
+    """Поколения нескольких областей одним обращением к кэшу."""
+    found = cache.get_many([_key(scope) for scope in scopes])
+    return {
+        scope: found[_key(scope)] if _key(scope) in found else version(scope)
+        for scope in scopes
+    }
+
+
+def bump(*scopes):
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.set(_key(scope), time.time_ns(), None)
+
+
+def post_scopes(post, old_group_id=None):
+    """Области, в которых виден пост (и его прежняя группа)."""
+    scopes = [INDEX, author_scope(post.author_id), post_scope(post.pk)]
+    for group_id in {post.group_id, old_group_id}:
+        if group_id is not None:
+            scopes.append(group_scope(group_id))
+    return scopes
+
+
+def user_scopes(user_id):
+    """Области, где показаны имя пользователя: его посты и комментарии.
+
+    Страница поста учитывает поколение автора в ``ETag`` сама, поэтому
+    отдельно перебираются только посты с комментариями пользователя.
+    """
+    scopes = {INDEX, author_scope(user_id), user_scope(user_id)}
+    posts = Post.objects.filter(author_id=user_id)
+    scopes.update(
+        group_scope(group_id)
+        for group_id in posts.exclude(group=None)
+        .order_by()
+        .values_list("group_id", flat=True)
+        .distinct()
+    )
+    scopes.update(
+        post_scope(post_id)
+        for post_id in Comment.objects.filter(author_id=user_id)
+        .order_by()
+        .values_list("post_id", flat=True)
+        .distinct()
+    )
+    return scopes
+
+
+def group_scopes(group_id):
+    """Области, где показаны название и адрес группы."""
+    scopes = {INDEX, group_scope(group_id), group_info_scope(group_id)}
+    scopes.update(
+        author_scope(author_id)
+        for author_id in Post.objects.filter(group_id=group_id)
+        .order_by()
+        .values_list("author_id", flat=True)
+        .distinct()
+    )
+    return scopes
+
+
+def context(scope):
+    """Переменные шаблона для версионного ``{% stampede_cache %}``."""
+    return {
+        "cache_version": version(scope),
+        "cache_timeout": settings.FEED_CACHE_TIMEOUT,
+    }
+
+
+def page(request, scope, queryset):
+    """Страница ленты из кэша текущего поколения области.
+
+    Кэшируются сами посты страницы и ее курсоры: при промахе запрос к базе
+    делает только один из одновременных запросов.
+    """
+    paginator = CursorPaginator(queryset, settings.PER_PAGE_COUNT)
+    query = "|".join(
+        (request.GET.get("cursor", ""), request.GET.get("page", ""))
+    )
+    key = "feed_page:{}:{}:{}".format(
+        scope, version(scope), hashlib.md5(query.encode()).hexdigest()
+    )
+    state = stampede.fetch(
+        key,
+        lambda: paginator.snapshot(request_page(request, paginator)),
+        settings.FEED_CACHE_TIMEOUT,
+    )
+    return paginator.restore(state)
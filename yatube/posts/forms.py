@@ -1,6 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
-from .models import Post, Comment
+from . import images
+from .models import Comment, Group, Post, User
 
 
 class PostForm(forms.ModelForm):
@@ -15,9 +17,41 @@ class PostForm(forms.ModelForm):
             raise forms.ValidationError("Наличие поста обязательно!")
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data["image"]
+        if isinstance(image, UploadedFile):
+            image, meta = images.process(image)
+        elif not image:
+            meta = images.empty_meta()
+        else:
+            return image
+        for field, value in meta.items():
+            setattr(self.instance, field, value)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ("text",)
         labels = {"text": "Текст комментария"}
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label="Поиск", max_length=200, required=False)
+    group = forms.ModelChoiceField(
+        Group.objects.order_by("title"),
+        label="Сообщество",
+        to_field_name="slug",
+        required=False,
+    )
+    author = forms.CharField(label="Автор", max_length=150, required=False)
+
+    def clean_author(self):
+        username = self.cleaned_data["author"]
+        if not username:
+            return None
+        author = User.objects.filter(username=username).first()
+        if author is None:
+            raise forms.ValidationError("Нет такого пользователя.")
+        return author
@@ -0,0 +1,105 @@
+"""Разбор загруженных картинок постов.
+
+Файл читается кусками: хэш и размер считаются потоком, а Pillow открывает
+картинку лениво и до декодирования видит только заголовок. Пиксели
+декодируются, лишь когда EXIF требует развернуть кадр, и их число
+ограничено ``POST_IMAGE_MAX_PIXELS``. Анимации и многостраничные файлы
+сохраняются как есть: пересохранение оставило бы от них первый кадр.
+"""
+import tempfile
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from PIL import Image, ImageOps
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from core import storage as stored_files
+from core.storage import content_hash
+from core.tasks import task
+
+from .models import Post
+
+# Тег EXIF с ориентацией кадра и значения, требующие поворота или
+# отражения; остальные ``exif_transpose`` только копирует.
+ORIENTATION = 0x0112
+TRANSPOSED_ORIENTATIONS = range(2, 9)
+
+
+def _needs_transpose(image):
+    if getattr(image, "n_frames", 1) > 1:
+        return False
+    return image.getexif().get(ORIENTATION) in TRANSPOSED_ORIENTATIONS
+
+
+def _normalized(image, name):
+    """Кадр, развернутый по EXIF, и его размеры; большой уходит на диск."""
+    spooled = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    format_ = image.format
+    with ImageOps.exif_transpose(image) as upright:
+        exif = upright.getexif()
+        exif.pop(ORIENTATION, None)
+        upright.save(spooled, format=format_, quality=95, exif=exif)
+        size = upright.size
+    spooled.seek(0)
+    return File(spooled, name=name), size
+
+
+def process(upload):
+    """Проверяет загрузку; возвращает файл для сохранения и метаданные."""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        width, height = image.size
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise forms.ValidationError(
+                "Слишком большая картинка: не больше %(limit)s пикселей.",
+                params={"limit": settings.POST_IMAGE_MAX_PIXELS},
+            )
+        if _needs_transpose(image):
+            upload, (width, height) = _normalized(image, upload.name)
+    return upload, {
+        "image_width": width,
+        "image_height": height,
+        "image_size": upload.size,
+        "image_hash": content_hash(upload),
+    }
+
+
+def empty_meta():
+    """Метаданные поста без картинки."""
+    return {
+        "image_width": None,
+        "image_height": None,
+        "image_size": None,
+        "image_hash": "",
+    }
+
+
+@task
+def delete_unused(name):
+    """Фоновая задача: удаляет картинку, на которую не осталось ссылок."""
+    storage = Post._meta.get_field("image").storage
+    try:
+        storage.path(name)
+    except SuspiciousFileOperation:
+        # Путь вне MEDIA_ROOT: файл не принадлежит хранилищу.
+        return
+    if Post.objects.filter(image=name).exists():
+        return
+    storage.delete_if_unused(
+        name, lambda name: delete(ImageFile(name, storage))
+    )
+
+
+def release(name):
+    """Убирает ссылку поста на картинку и ставит задачу удаления.
+
+    Картинки хранятся по хэшу содержимого и общие у одинаковых загрузок;
+    файл удаляется, только когда счетчик ссылок ``StoredFile`` обнулится.
+    """
+    stored_files.release(name)
+    delete_unused.delay(name)
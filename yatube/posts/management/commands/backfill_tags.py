@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import tags
+
+
+class Command(BaseCommand):
+    help = "Индексирует теги и упоминания в уже опубликованных постах."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Сколько постов читать и индексировать за один проход.",
+        )
+
+    def handle(self, *args, **options):
+        created = tags.backfill(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Добавлено записей индекса: {created}.")
+        )
@@ -0,0 +1,82 @@
+import random
+from statistics import median, quantiles
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from posts import autocomplete
+
+SYLLABLES = (
+    "ка", "ро", "ми", "ту", "ле", "на", "во", "си", "да", "пу",
+    "al", "ex", "an", "dr", "ol", "ga", "ni", "ko", "ma", "ri",
+)
+
+
+def _name(rng, low=2, high=4):
+    length = rng.randint(low, high)
+    return "".join(rng.choice(SYLLABLES) for _ in range(length))
+
+
+def _typo(word, rng):
+    position = rng.randrange(len(word) - 1)
+    return word[:position] + word[position + 1] + word[position] + word[
+        position + 2:
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Измеряет построение индекса автодополнения и время поиска "
+        "на синтетических пользователях; база не используется."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--groups", type=int, default=10_000)
+        parser.add_argument("--queries", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        users = [
+            (pk, f"{_name(rng)}{pk}", _name(rng).title(), _name(rng).title())
+            for pk in range(1, options["users"] + 1)
+        ]
+        groups = [
+            (pk, f"{_name(rng)} {_name(rng)}", f"group-{pk}")
+            for pk in range(1, options["groups"] + 1)
+        ]
+        started = perf_counter()
+        index = autocomplete.Index(
+            [autocomplete.user_entry(*row) for row in users]
+            + [autocomplete.group_entry(*row) for row in groups]
+        )
+        self.stdout.write(
+            f"Пользователи: {len(users)}, группы: {len(groups)}, "
+            f"построение {perf_counter() - started:.1f} с."
+        )
+        samples = rng.sample(users, options["queries"])
+        queries = {
+            "префикс username": [row[1][:4] for row in samples],
+            "фамилия": [row[3] for row in samples],
+            "опечатка": [_typo(row[1], rng) for row in samples],
+        }
+        self.stdout.write(f"{'запрос':<18} {'p50 ms':>8} {'p99 ms':>8}")
+        for label, texts in queries.items():
+            timings = []
+            for text in texts:
+                started = perf_counter()
+                index.lookup(text)
+                timings.append((perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"{label:<18} {median(timings):>8.3f} "
+                f"{quantiles(timings, n=100)[-1]:>8.3f}"
+            )
+        started = perf_counter()
+        for pk, username, first_name, last_name in samples[:100]:
+            index.update(
+                *autocomplete.user_entry(pk, username + "x", first_name, "")
+            )
+        self.stdout.write(
+            "Обновление записи: "
+            f"{(perf_counter() - started) * 10:.3f} мс в среднем."
+        )
@@ -0,0 +1,107 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from posts import timeline
+from posts.models import Follow, Post, User
+
+PER_PAGE = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает стратегии ленты подписок (push, pull, hybrid) "
+        "на синтетических данных; все изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--authors", type=int, default=200)
+        parser.add_argument("--celebrities", type=int, default=3)
+        parser.add_argument("--followers", type=int, default=5000)
+        parser.add_argument("--posts", type=int, default=20)
+        parser.add_argument("--pages", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            reader, celebrity = self.seed(options)
+            limit = options["followers"] // 2
+            rows = []
+            for strategy in timeline.STRATEGIES:
+                with override_settings(TIMELINE_PUSH_FOLLOWER_LIMIT=limit):
+                    rows.append(
+                        (strategy,)
+                        + self.measure(strategy, reader, celebrity, options)
+                    )
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f"{'strategy':<8} {'write ms':>10} {'page 1 ms':>10} "
+            f"{'page N ms':>10}"
+        )
+        for strategy, write, first, deep in rows:
+            self.stdout.write(
+                f"{strategy:<8} {write:>10.2f} {first:>10.2f} {deep:>10.2f}"
+            )
+
+    def seed(self, options):
+        User.objects.bulk_create(
+            (
+                User(username=f"bench_user_{i}")
+                for i in range(options["authors"] + options["followers"] + 1)
+            ),
+            batch_size=500,
+        )
+        users = list(
+            User.objects.filter(username__startswith="bench_user_").order_by(
+                "pk"
+            )
+        )
+        reader = users[0]
+        authors = users[1: options["authors"] + 1]
+        followers = users[options["authors"] + 1:]
+        celebrities = authors[: options["celebrities"]]
+        follows = [Follow(user=reader, author=author) for author in authors]
+        follows += [
+            Follow(user=follower, author=celebrity)
+            for celebrity in celebrities
+            for follower in followers
+        ]
+        Follow.objects.bulk_create(follows, batch_size=500)
+        Post.objects.bulk_create(
+            (
+                Post(author=author, text=f"bench {i}")
+                for author in authors
+                for i in range(options["posts"])
+            ),
+            batch_size=500,
+        )
+        return reader, celebrities[0]
+
+    def measure(self, strategy, reader, celebrity, options):
+        limit = options["followers"] + 1
+        if strategy == timeline.PUSH:
+            with override_settings(TIMELINE_PUSH_FOLLOWER_LIMIT=limit):
+                timeline.rebuild([reader.pk])
+        else:
+            timeline.rebuild([reader.pk])
+        post = Post(author=celebrity, text="bench")
+        post.save()
+        started = perf_counter()
+        timeline.fan_out(post, strategy)
+        write = (perf_counter() - started) * 1000
+
+        started = perf_counter()
+        paginator = timeline.follow_paginator(reader, PER_PAGE, strategy)
+        page = paginator.cursor_page()
+        first = (perf_counter() - started) * 1000
+        deep = 0
+        for _ in range(options["pages"]):
+            cursor = page.paginator.next_cursor
+            if cursor is None:
+                break
+            started = perf_counter()
+            paginator = timeline.follow_paginator(reader, PER_PAGE, strategy)
+            page = paginator.cursor_page(cursor=cursor)
+            deep = (perf_counter() - started) * 1000
+        return write, first, deep
@@ -0,0 +1,97 @@
+import random
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+from posts.models import Post, User
+
+SYLLABLES = ("ка", "ро", "ми", "ту", "ле", "на", "во", "си", "да", "пу")
+
+
+def _vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        )
+    return sorted(words)
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает поиск FTS5 с icontains на синтетических постах; "
+        "все изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1_000_000)
+        parser.add_argument("--words", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        vocabulary = _vocabulary(5000, rng)
+        with transaction.atomic():
+            started = perf_counter()
+            self.seed(options, vocabulary, rng)
+            self.stdout.write(
+                f"Посты: {options['posts']}, заполнение с индексацией "
+                f"{perf_counter() - started:.1f} с."
+            )
+            queries = {
+                "частое слово": vocabulary[0],
+                "редкое слово": vocabulary[-1],
+                "два слова": f"{vocabulary[0]} {vocabulary[1]}",
+            }
+            rows = [
+                (label,) + self.measure(text, options["repeat"])
+                for label, text in queries.items()
+            ]
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f"{'запрос':<14} {'icontains ms':>13} {'+count ms':>10} "
+            f"{'fts5 ms':>10}"
+        )
+        for label, like, count, fts in rows:
+            self.stdout.write(
+                f"{label:<14} {like:>13.2f} {count:>10.2f} {fts:>10.2f}"
+            )
+
+    def seed(self, options, vocabulary, rng):
+        author = User.objects.create(username="bench_search_author")
+        batch = []
+        for _ in range(options["posts"]):
+            # Степенное распределение: первые слова словаря частые.
+            words = (
+                vocabulary[int(len(vocabulary) * rng.random() ** 3)]
+                for _ in range(options["words"])
+            )
+            batch.append(Post(author=author, text=" ".join(words)))
+            if len(batch) == options["batch_size"]:
+                Post.objects.bulk_create(batch)
+                batch = []
+        Post.objects.bulk_create(batch)
+
+    def measure(self, text, repeat):
+        """Медианы первой страницы, мс: LIKE, LIKE с COUNT(*) и FTS5.
+
+        COUNT(*) добавляют обычный ``Paginator`` и поиск в админке.
+        """
+        like = Post.objects.all()
+        for word in text.split():
+            like = like.filter(text__icontains=word)
+        timings = ([], [], [])
+        for _ in range(repeat):
+            started = perf_counter()
+            list(like.order_by("-pub_date", "-pk")[:10])
+            timings[0].append((perf_counter() - started) * 1000)
+            like.count()
+            timings[1].append((perf_counter() - started) * 1000)
+            started = perf_counter()
+            search.SearchPaginator(search.search(text), 10).cursor_page()
+            timings[2].append((perf_counter() - started) * 1000)
+        return tuple(median(values) for values in timings)
@@ -0,0 +1,72 @@
+import json
+from statistics import median
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from posts import api, serializers
+from posts.models import Group, Post, User
+
+FIELDSETS = {
+    "все поля": None,
+    "без связей": "id,text,pub_date,url",
+    "id и автор": "id,author.username",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Измеряет стоимость сериализации поста для JSON API в "
+        "микросекундах на элемент; база не используется."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        items = self.items(options["items"])
+        self.stdout.write(
+            f"{'поля':<12} {'словарь мкс':>12} {'+json мкс':>10} "
+            f"{'байт':>6}"
+        )
+        for label, fields in FIELDSETS.items():
+            plan = serializers.posts.plan(serializers.parse_fields(fields))
+            build, encode = [], []
+            for _ in range(options["repeat"]):
+                started = perf_counter()
+                data = [serializers.serialize(plan, post) for post in items]
+                build.append(perf_counter() - started)
+                started = perf_counter()
+                body = json.dumps(
+                    data, cls=DjangoJSONEncoder, **api.JSON_DUMPS_PARAMS
+                ).encode()
+                encode.append(perf_counter() - started)
+            per_item = 1_000_000 / len(items)
+            self.stdout.write(
+                f"{label:<12} {median(build) * per_item:>12.2f} "
+                f"{(median(build) + median(encode)) * per_item:>10.2f} "
+                f"{len(body) // len(items):>6}"
+            )
+
+    def items(self, count):
+        """Несохраненные посты с автором и группой, как после выборки."""
+        author = User(
+            pk=1, username="bench_author", first_name="Имя", last_name="Фам"
+        )
+        group = Group(pk=1, title="Группа", slug="bench", description="...")
+        now = timezone.now()
+        return [
+            Post(
+                pk=number,
+                text=f"Пост номер {number} " * 10,
+                pub_date=now,
+                updated=now,
+                author=author,
+                group=group,
+                comments_count=number % 7,
+            )
+            for number in range(1, count + 1)
+        ]
@@ -0,0 +1,96 @@
+import tempfile
+from io import BytesIO
+from time import perf_counter
+
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from PIL import Image
+
+from posts import thumbnails
+from posts.models import Post, User
+
+BENCH_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "thumbnails": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bench-thumbnails",
+    },
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает поштучный и пакетный поиск миниатюр для страницы ленты; "
+        "все изменения откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=10)
+        parser.add_argument("--rounds", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, CACHES=BENCH_CACHES, THUMBNAIL_CACHE="thumbnails"
+        ), transaction.atomic():
+            names = self.seed(options["posts"])
+            rows = [
+                (mode, self.measure(lookup, names, options["rounds"], cold))
+                for cold in (False, True)
+                for mode, lookup in (
+                    ("single", self.single),
+                    ("batch", self.batch),
+                )
+            ]
+            transaction.set_rollback(True)
+        self.stdout.write(f"{'lookup':<8} {'cache':<6} {'ms/page':>10}")
+        for index, (mode, spent) in enumerate(rows):
+            state = "cold" if index >= 2 else "warm"
+            self.stdout.write(f"{mode:<8} {state:<6} {spent:>10.3f}")
+
+    def seed(self, count):
+        author = User.objects.create(username="bench_thumbnails")
+        names = []
+        for i in range(count):
+            buffer = BytesIO()
+            Image.new("RGB", (1600, 900), (i * 7 % 256, 90, 160)).save(
+                buffer, "JPEG"
+            )
+            post = Post(author=author, text=f"bench {i}")
+            post.image.save(
+                f"bench_{i}.jpg", ContentFile(buffer.getvalue()), save=True
+            )
+            thumbnails.generate(post.image.name)
+            names.append(post.image.name)
+        return names
+
+    def single(self, names):
+        return [
+            thumbnails.default.backend.get_thumbnail(
+                name, geometry, **options
+            ).url
+            for name in names
+            for geometry, options in thumbnails.VARIANTS
+        ]
+
+    def batch(self, names):
+        found = thumbnails.default.backend.get_variants(
+            names, thumbnails.VARIANTS
+        )
+        return [
+            thumbnail.url
+            for variants in found.values()
+            for thumbnail in variants
+        ]
+
+    def measure(self, lookup, names, rounds, cold):
+        spent = 0.0
+        for _ in range(rounds):
+            if cold:
+                caches["thumbnails"].clear()
+            started = perf_counter()
+            lookup(names)
+            spent += perf_counter() - started
+        return spent / rounds * 1000
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Создает недостающие миниатюры для картинок существующих постов."
+
+    def handle(self, *args, **options):
+        names = (
+            Post.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+            .iterator()
+        )
+        created = sum(thumbnails.generate(name) for name in names)
+        self.stdout.write(
+            self.style.SUCCESS(f"Созданы миниатюры для картинок: {created}.")
+        )
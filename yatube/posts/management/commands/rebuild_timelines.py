@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Имена читателей; без аргументов пересобираются все ленты.",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["usernames"]:
+            user_ids = list(
+                User.objects.filter(
+                    username__in=options["usernames"]
+                ).values_list("pk", flat=True)
+            )
+        timeline.rebuild(user_ids)
+        self.stdout.write(self.style.SUCCESS("Ленты пересобраны."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счетчики постов и подписок."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--background",
+            action="store_true",
+            help="Поставить пересчет в очередь фоновых задач.",
+        )
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            counters.reconcile.delay(options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS("Пересчет поставлен в очередь.")
+            )
+            return
+        fixed = counters.reconcile(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Исправлено счетчиков: {fixed}.")
+        )
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _size(storage, name):
+    try:
+        return storage.size(name)
+    except OSError:
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает размеры вариантов картинок постов и средний объем "
+        "картинок на страницу ленты."
+    )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image="")
+            .order_by()
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        found = thumbnails.default.backend.get_variants(
+            names, thumbnails.VARIANTS
+        )
+        rows = [
+            ("original", "", [_size(default_storage, name) for name in names])
+        ]
+        for index, (geometry, variant) in enumerate(thumbnails.VARIANTS):
+            sizes = [
+                _size(thumbnail.storage, thumbnail.name)
+                for thumbnail in (found[name][index] for name in names)
+                if not isinstance(thumbnail, thumbnails.Placeholder)
+            ]
+            rows.append((geometry, variant["format"], sizes))
+        self.stdout.write(
+            f"{'variant':<10} {'format':<6} {'files':>6} {'total KB':>10} "
+            f"{'avg KB':>8} {'page KB':>8}"
+        )
+        for geometry, format_, sizes in rows:
+            sizes = [size for size in sizes if size is not None]
+            total = sum(sizes) / 1024
+            average = total / len(sizes) if sizes else 0
+            self.stdout.write(
+                f"{geometry:<10} {format_:<6} {len(sizes):>6} "
+                f"{total:>10.1f} {average:>8.1f} "
+                f"{average * settings.PER_PAGE_COUNT:>8.1f}"
+            )
@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import Count
+
+
+def count_refs(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    StoredFile = apps.get_model("core", "StoredFile")
+    rows = (
+        Post.objects.exclude(image="")
+        .values("image")
+        .annotate(refs=Count("pk"))
+        .order_by()
+    )
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=row["image"], refs=row["refs"]) for row in rows],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_stored_file"),
+        ("posts", "0016_tags_and_mentions"),
+    ]
+
+    operations = [
+        migrations.RunPython(count_refs, migrations.RunPython.noop),
+    ]
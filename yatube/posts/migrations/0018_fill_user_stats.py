@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def _grouped(queryset, field):
+    return dict(
+        queryset.order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values_list(field, "total")
+    )
+
+
+def fill_user_stats(apps, schema_editor):
+    """Создает недостающие строки ``UserStats`` пачками пользователей.
+
+    Без строки чтение профиля и поста считает счетчики по базе и пишет
+    строку прямо в запросе.
+    """
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Post = apps.get_model("posts", "Post")
+    Follow = apps.get_model("posts", "Follow")
+    UserStats = apps.get_model("posts", "UserStats")
+    user_ids = User.objects.filter(stats__isnull=True).order_by("pk")
+    last_pk = 0
+    while True:
+        chunk = list(
+            user_ids.filter(pk__gt=last_pk).values_list("pk", flat=True)[
+                :BATCH_SIZE
+            ]
+        )
+        if not chunk:
+            return
+        last_pk = chunk[-1]
+        posts = _grouped(Post.objects.filter(author_id__in=chunk), "author_id")
+        followers = _grouped(
+            Follow.objects.filter(author_id__in=chunk), "author_id"
+        )
+        following = _grouped(
+            Follow.objects.filter(user_id__in=chunk), "user_id"
+        )
+        UserStats.objects.bulk_create(
+            [
+                UserStats(
+                    user_id=user_id,
+                    posts_count=posts.get(user_id, 0),
+                    followers_count=followers.get(user_id, 0),
+                    following_count=following.get(user_id, 0),
+                )
+                for user_id in chunk
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0017_stored_file_refs"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
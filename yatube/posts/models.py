@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -29,6 +31,7 @@ class Post(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True, verbose_name="Дата публикации"
     )
+    updated = models.DateTimeField(auto_now=True, verbose_name="Изменен")
     group = models.ForeignKey(
         Group,
         blank=True,
@@ -43,12 +46,49 @@ class Post(models.Model):
         related_name="posts",
         verbose_name="Автор",
     )
-    image = models.ImageField("Картинка", upload_to="posts/", blank=True)
+    image = models.ImageField(
+        "Картинка",
+        upload_to="posts/",
+        storage=ContentAddressedStorage(),
+        blank=True,
+        db_index=True,
+    )
+    image_width = models.PositiveIntegerField(
+        null=True, editable=False, verbose_name="Ширина картинки"
+    )
+    image_height = models.PositiveIntegerField(
+        null=True, editable=False, verbose_name="Высота картинки"
+    )
+    image_size = models.PositiveIntegerField(
+        null=True, editable=False, verbose_name="Размер картинки, байт"
+    )
+    image_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        verbose_name="SHA-256 картинки",
+    )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Число комментариев"
+    )
 
     class Meta:
         ordering = ["-pub_date"]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        indexes = [
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_pub_date_idx",
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_pub_date_idx",
+            ),
+            models.Index(
+                fields=["-pub_date", "-id"], name="post_pub_date_id_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -78,6 +118,11 @@ class Comment(models.Model):
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ("-created",)
+        indexes = [
+            models.Index(
+                fields=["post", "-created"], name="comment_post_created_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.text
@@ -96,3 +141,172 @@ class Follow(models.Model):
         related_name="following",
         verbose_name="Автор поста",
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique_follow"
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Пользователь",
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name="Число постов"
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name="Число подписчиков"
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name="Число подписок"
+    )
+
+    class Meta:
+        verbose_name = "Счетчики пользователя"
+        verbose_name_plural = "Счетчики пользователей"
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Читатель",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        ordering = ("-pub_date", "-post")
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_pub_date_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry"
+            ),
+        ]
+
+
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True, verbose_name="Тег")
+
+    class Meta:
+        verbose_name = "Тег"
+        verbose_name_plural = "Теги"
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
+class PostTag(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="tag_entries",
+        verbose_name="Пост",
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        related_name="entries",
+        verbose_name="Тег",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        verbose_name = "Тег поста"
+        verbose_name_plural = "Теги постов"
+        indexes = [
+            models.Index(
+                fields=["tag", "-pub_date", "-post"],
+                name="post_tag_pub_date_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "tag"], name="unique_post_tag"
+            ),
+        ]
+
+
+class Mention(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="mentions",
+        verbose_name="Пост",
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="mentions",
+        verbose_name="Упомянутый",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        verbose_name = "Упоминание"
+        verbose_name_plural = "Упоминания"
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="mention_user_pub_date_idx",
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "user"], name="unique_mention"
+            ),
+        ]
+
+
+class SearchTextField(models.TextField):
+    """Колонка полнотекстового индекса FTS5."""
+
+
+@SearchTextField.register_lookup
+class Match(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class PostSearchIndex(models.Model):
+    """Индекс FTS5 по тексту постов; ведется триггерами базы."""
+
+    post = models.OneToOneField(
+        Post,
+        primary_key=True,
+        db_column="rowid",
+        on_delete=models.DO_NOTHING,
+        related_name="search_index",
+    )
+    text = SearchTextField()
+
+    class Meta:
+        managed = False
+        db_table = "posts_post_fts"
@@ -0,0 +1,208 @@
+import base64
+import binascii
+import heapq
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+def encode_cursor(direction, number, value, pk):
+    """Упаковывает позицию в ленте в непрозрачный токен."""
+    value = value.isoformat() if hasattr(value, "isoformat") else repr(value)
+    raw = f"{direction}{number}|{value}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, parse_value=parse_datetime):
+    """Распаковывает токен; для битого токена возвращает None."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        head, value, pk = raw.split("|")
+        direction, number = head[0], int(head[1:])
+        value = parse_value(value)
+        pk = int(pk)
+    except (ValueError, IndexError, binascii.Error, UnicodeDecodeError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or value is None or number < 1:
+        return None
+    return direction, number, value, pk
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Страницы адресуются токенами ``?cursor=``; старые ссылки ``?page=N``
+    обслуживаются через OFFSET, но не глубже ``PAGINATOR_MAX_OFFSET_PAGE``.
+    """
+
+    # Разбор значения ``date_field`` из токена.
+    parse_value = staticmethod(parse_datetime)
+
+    def __init__(
+        self, object_list, per_page, date_field="pub_date", key_field="pk"
+    ):
+        super().__init__(object_list, per_page)
+        self.date_field = date_field
+        self.key_field = key_field
+        self.next_cursor = None
+        self.previous_cursor = None
+        self._num_pages = 1
+
+    @property
+    def num_pages(self):
+        return self._num_pages
+
+    @property
+    def page_range(self):
+        return range(1, self._num_pages + 1)
+
+    def _ordered(self, descending=True):
+        sign = "-" if descending else ""
+        return self.object_list.order_by(
+            f"{sign}{self.date_field}", f"{sign}{self.key_field}"
+        )
+
+    def _position(self, item):
+        return getattr(item, self.date_field), getattr(item, self.key_field)
+
+    def _fetch(self, limit, position=None, descending=True, offset=0):
+        """Читает ``limit`` записей после позиции в заданном порядке."""
+        queryset = self._ordered(descending)
+        if position is not None:
+            value, pk = position
+            lookup = "lt" if descending else "gt"
+            queryset = queryset.filter(
+                Q(**{f"{self.date_field}__{lookup}": value})
+                | Q(
+                    **{
+                        self.date_field: value,
+                        f"{self.key_field}__{lookup}": pk,
+                    }
+                )
+            )
+        return list(queryset[offset: offset + limit])
+
+    def _cursor_for(self, direction, number, item):
+        return encode_cursor(direction, number, *self._position(item))
+
+    def _build(self, items, number, has_next):
+        if number > 1 and items:
+            self.previous_cursor = self._cursor_for(
+                PREVIOUS, number - 1, items[0]
+            )
+        if has_next:
+            self.next_cursor = self._cursor_for(NEXT, number + 1, items[-1])
+        self._num_pages = number + 1 if has_next else number
+        return self._get_page(items, number, self)
+
+    def snapshot(self, page):
+        """Состояние страницы, пригодное для кэша."""
+        return {
+            "items": list(page.object_list),
+            "number": page.number,
+            "next_cursor": self.next_cursor,
+            "previous_cursor": self.previous_cursor,
+        }
+
+    def restore(self, state):
+        """Страница из сохраненного ``snapshot`` без запросов к базе."""
+        self.next_cursor = state["next_cursor"]
+        self.previous_cursor = state["previous_cursor"]
+        number = state["number"]
+        self._num_pages = number + 1 if self.next_cursor else number
+        return self._get_page(state["items"], number, self)
+
+    def cursor_page(self, cursor=None, number=None):
+        """Возвращает страницу по токену или по устаревшему номеру."""
+        limit = self.per_page + 1
+        position = (
+            decode_cursor(cursor, self.parse_value) if cursor else None
+        )
+        if position is not None:
+            direction, number, value, pk = position
+            if direction == NEXT:
+                items = self._fetch(limit, (value, pk))
+                return self._build(
+                    items[: self.per_page],
+                    number,
+                    len(items) > self.per_page,
+                )
+            items = self._fetch(limit, (value, pk), descending=False)
+            if len(items) <= self.per_page:
+                return self.cursor_page()
+            items = items[: self.per_page]
+            items.reverse()
+            return self._build(items, number, True)
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        number = min(number, settings.PAGINATOR_MAX_OFFSET_PAGE)
+        items = self._fetch(limit, offset=(number - 1) * self.per_page)
+        if not items and number > 1:
+            # Как ``Paginator.get_page``: номер за концом ленты отдает
+            # последнюю страницу. Чтение ограничено тем же OFFSET.
+            items = self._fetch((number - 1) * self.per_page)
+            number = max(-(-len(items) // self.per_page), 1)
+            items = items[(number - 1) * self.per_page:]
+        return self._build(
+            items[: self.per_page], number, len(items) > self.per_page
+        )
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсорный паджинатор поверх нескольких упорядоченных источников.
+
+    Каждый источник - ``CursorPaginator`` со своим запросом; страницы
+    собираются слиянием через кучу по ключу (дата, id) элементов.
+    """
+
+    def __init__(
+        self, sources, per_page, date_field="pub_date", key_field="pk"
+    ):
+        super().__init__(
+            None, per_page, date_field=date_field, key_field=key_field
+        )
+        self.sources = sources
+
+    def _fetch(self, limit, position=None, descending=True, offset=0):
+        streams = [
+            source._fetch(offset + limit, position, descending)
+            for source in self.sources
+        ]
+        items = []
+        seen = set()
+        for item in heapq.merge(
+            *streams, key=self._position, reverse=descending
+        ):
+            if item.pk in seen:
+                continue
+            seen.add(item.pk)
+            items.append(item)
+            if len(items) == offset + limit:
+                break
+        return items[offset:]
+
+
+def request_page(request, paginator):
+    """Страница паджинатора по параметрам ``cursor`` и ``page`` запроса."""
+    return paginator.cursor_page(
+        cursor=request.GET.get("cursor"), number=request.GET.get("page")
+    )
+
+
+def paginate(request, queryset, date_field="pub_date", key_field="pk"):
+    """Страница ленты для текущего запроса."""
+    paginator = CursorPaginator(
+        queryset,
+        settings.PER_PAGE_COUNT,
+        date_field=date_field,
+        key_field=key_field,
+    )
+    return request_page(request, paginator)
@@ -0,0 +1,221 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Таблица ``posts_post_fts`` хранит только индекс: текст берется из
+``posts_post`` (external content), а синхронизацию ведут триггеры базы,
+поэтому индекс не отстает и при ``QuerySet.update``/``delete``. Django
+пересоздает таблицу при некоторых миграциях ``Post``, и триггеры при этом
+теряются: команда ``rebuild_search_index`` создает их заново и
+переиндексирует посты.
+"""
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+from django.db.models import F, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post, PostSearchIndex
+from .paginators import CursorPaginator
+
+TABLE = PostSearchIndex._meta.db_table
+SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='3 4 5')",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_insert AFTER INSERT ON posts_post "
+    f"BEGIN INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_delete AFTER DELETE ON posts_post "
+    f"BEGIN INSERT INTO {TABLE}({TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABLE}_update AFTER UPDATE OF text "
+    "ON posts_post WHEN old.text IS NOT new.text "
+    f"BEGIN INSERT INTO {TABLE}({TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {TABLE}(rowid, text) VALUES (new.id, new.text); END",
+)
+# Границы подсветки во фрагменте; в тексте поста их не бывает.
+MARK_START = "\x02"
+MARK_END = "\x03"
+WORD = re.compile(r"\w+")
+PREFIX_MIN_LENGTH = 3
+# Релевантность совпадений вне окна; у ранжированных -bm25 больше нуля.
+OLDER_RANK = -1.0
+
+Results = namedtuple("Results", "ranked older boundary")
+
+
+def rebuild():
+    """Создает таблицу и триггеры, если их нет, и переиндексирует посты."""
+    with connection.cursor() as cursor:
+        for statement in SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('rebuild')")
+
+
+def match_query(text):
+    """Запрос FTS5 из слов пользователя: все слова, последнее — префикс.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 в строке поиска не
+    работают и не ломают разбор. Префиксы длиной 3-5 символов есть в
+    индексе (``prefix``); слово короче трех символов ищется целиком, иначе
+    запрос склеивал бы списки всех слов на эти буквы.
+    """
+    words = WORD.findall(text)
+    if not words:
+        return ""
+    query = " ".join(f'"{word}"' for word in words)
+    return query + "*" if len(words[-1]) >= PREFIX_MIN_LENGTH else query
+
+
+def rank_boundary(posts):
+    """rowid самого старого из ``SEARCH_RANK_WINDOW`` новых совпадений.
+
+    Индекс FTS5 отдает эту границу по rowid, не считая релевантность; 0 —
+    все совпадения помещаются в окно.
+    """
+    window = settings.SEARCH_RANK_WINDOW
+    oldest = (
+        posts.order_by(F("search_index__pk").desc())
+        .values_list("search_index__pk", flat=True)[window - 1: window]
+        .first()
+    )
+    return oldest or 0
+
+
+def _signer(text, group, author):
+    """Подпись границы окна, привязанная к запросу и фильтрам.
+
+    Граница из ссылки не пересчитывается, поэтому клиент не должен
+    подставлять свою: ``window=0`` заставил бы ранжировать все совпадения.
+    """
+    return signing.Signer(
+        salt="posts.search.window:{}:{}:{}".format(
+            match_query(text),
+            group.pk if group is not None else "",
+            author.pk if author is not None else "",
+        )
+    )
+
+
+def sign_boundary(boundary, text, group=None, author=None):
+    return _signer(text, group, author).sign(str(boundary))
+
+
+def unsign_boundary(value, text, group=None, author=None):
+    """Граница из подписанного значения; None — нет его или подпись чужая."""
+    if not value:
+        return None
+    try:
+        return int(_signer(text, group, author).unsign(value))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def _snippet():
+    return RawSQL(
+        f"snippet({TABLE}, 0, %s, %s, '…', %s)",
+        (MARK_START, MARK_END, settings.SEARCH_SNIPPET_TOKENS),
+    )
+
+
+def search(text, group=None, author=None, boundary=None):
+    """Найденные посты: лучшие в окне свежих совпадений, затем остальные.
+
+    bm25 считается для каждого ранжируемого совпадения, и для слова,
+    которое есть в большинстве постов, ранжирование всех совпадений стоит
+    секунды. Поэтому по релевантности упорядочиваются только совпадения
+    не старше ``boundary`` (по умолчанию — граница окна
+    ``SEARCH_RANK_WINDOW``), а более старые идут за ними от новых к старым
+    по rowid индекса, без bm25. Ссылки на следующие страницы передают
+    границу дальше, чтобы новые посты не сдвигали окно под курсором.
+    """
+    query = match_query(text)
+    if not query:
+        empty = Post.objects.none().annotate(
+            rank=Value(OLDER_RANK, output_field=FloatField())
+        )
+        return Results(empty, empty, 0)
+    posts = Post.objects.filter(search_index__text__match=query)
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    if boundary is None:
+        boundary = rank_boundary(posts)
+    posts = posts.select_related("author", "group")
+    ranked = posts.filter(search_index__pk__gte=boundary).annotate(
+        # bm25 меньше у лучших совпадений; знак меняется, чтобы
+        # паджинатор шел по убыванию, как в лентах.
+        rank=RawSQL(f"-bm25({TABLE})", ()),
+        snippet=_snippet(),
+    )
+    older = posts.filter(search_index__pk__lt=boundary).annotate(
+        rank=Value(OLDER_RANK, output_field=FloatField()),
+        snippet=_snippet(),
+    )
+    return Results(ranked, older, boundary)
+
+
+def highlight(snippet):
+    """Фрагмент с найденными словами в ``<mark>``; остальное экранируется."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, "<mark>")
+        .replace(MARK_END, "</mark>")
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорный паджинатор результатов ``search``.
+
+    Ранжированные совпадения идут по ключу (релевантность, id), а за ними
+    старые — по rowid индекса FTS5, который отдает их в этом порядке сам,
+    без сортировки и без фрагментов для всех строк.
+    """
+
+    parse_value = staticmethod(float)
+
+    def __init__(self, results, per_page):
+        super().__init__(results.ranked, per_page, date_field="rank")
+        self.older = results.older
+
+    def _fetch_older(self, limit, pk=None, descending=True):
+        key = F("search_index__pk")
+        queryset = self.older.order_by(
+            key.desc() if descending else key.asc()
+        )
+        if pk is not None:
+            lookup = "lt" if descending else "gt"
+            queryset = queryset.filter(**{f"search_index__pk__{lookup}": pk})
+        return list(queryset[:limit])
+
+    def _fetch(self, limit, position=None, descending=True, offset=0):
+        total = offset + limit
+        older_pk = None
+        if position is not None and position[0] <= OLDER_RANK:
+            older_pk = position[1]
+        if descending:
+            items = (
+                []
+                if older_pk is not None
+                else super()._fetch(total, position)
+            )
+            if len(items) < total:
+                items += self._fetch_older(total - len(items), older_pk)
+        else:
+            items = (
+                []
+                if older_pk is None
+                else self._fetch_older(total, older_pk, descending=False)
+            )
+            if len(items) < total:
+                items += super()._fetch(
+                    total - len(items),
+                    None if older_pk is not None else position,
+                    descending=False,
+                )
+        return items[offset:]
@@ -0,0 +1,144 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    autocomplete,
+    counters,
+    feed_cache,
+    images,
+    tags,
+    thumbnails,
+    timeline,
+)
+from .models import Comment, Follow, Group, Post, User
+
+# Поля пользователя, которые попадают в индекс автодополнения.
+USER_INDEXED_FIELDS = {"username", "first_name", "last_name"}
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    old = None
+    if instance.pk is not None:
+        old = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group_id", "image", "text")
+            .first()
+        )
+    (
+        instance._old_group_id,
+        instance._old_image,
+        instance._old_text,
+    ) = old or (None, "", None)
+    # Новый файл поля сохранится в хранилище и возьмет свою ссылку, даже
+    # если его имя (хэш) совпадет с прежним.
+    instance._image_uploaded = bool(instance.image) and not getattr(
+        instance.image, "_committed", True
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    feed_cache.bump(*feed_cache.post_scopes(instance, instance._old_group_id))
+    if instance._old_image and (
+        instance._image_uploaded or instance._old_image != instance.image.name
+    ):
+        images.release(instance._old_image)
+    if instance.image and instance._old_image != instance.image.name:
+        thumbnails.schedule_for(instance)
+    if instance._old_text != instance.text:
+        tags.index(instance, created)
+    if created:
+        counters.bump_user(instance.author_id, "posts_count", 1)
+        timeline.fan_out(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    feed_cache.bump(*feed_cache.post_scopes(instance))
+    counters.bump_user(instance.author_id, "posts_count", -1)
+    if instance.image:
+        images.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    feed_cache.bump(feed_cache.post_scope(instance.post_id))
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.post_scope(instance.post_id))
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, "followers_count", 1)
+        counters.bump_user(instance.user_id, "following_count", 1)
+        timeline.followers_changed(instance.author_id, 1)
+        timeline.subscribe(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, "followers_count", -1)
+    counters.bump_user(instance.user_id, "following_count", -1)
+    timeline.followers_changed(instance.author_id, -1)
+    timeline.unsubscribe(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if not created:
+        feed_cache.bump(*feed_cache.group_scopes(instance.pk))
+    autocomplete.changed(
+        autocomplete.GROUP,
+        instance.pk,
+        autocomplete.group_entry(instance.pk, instance.title, instance.slug),
+    )
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления посты уже без группы, и их авторов не найти.
+    feed_cache.bump(*feed_cache.group_scopes(instance.pk))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    autocomplete.changed(autocomplete.GROUP, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    # Вход в систему сохраняет только last_login.
+    if update_fields and not USER_INDEXED_FIELDS.intersection(update_fields):
+        return
+    if created:
+        counters.create_stats(instance.pk)
+    else:
+        feed_cache.bump(*feed_cache.user_scopes(instance.pk))
+    autocomplete.changed(
+        autocomplete.USER,
+        instance.pk,
+        autocomplete.user_entry(
+            instance.pk,
+            instance.username,
+            instance.first_name,
+            instance.last_name,
+        ),
+    )
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    autocomplete.changed(autocomplete.USER, instance.pk)
@@ -0,0 +1,156 @@
+"""Индекс хештегов и упоминаний в текстах постов.
+
+Теги ``#слово`` и упоминания ``@username`` разбираются при сохранении поста
+и пишутся в ``PostTag`` и ``Mention`` вместе с датой публикации, поэтому
+ленты тега и упоминаний читаются по индексу (тег/пользователь, дата, id)
+курсором, не просматривая тексты. Посты, созданные до появления индекса,
+дозаполняет команда ``backfill_tags``.
+"""
+import re
+
+from django.db.models import F
+
+from .models import Mention, Post, PostTag, Tag, User
+from .paginators import CursorPaginator
+
+# Тег или упоминание начинается с начала строки или после пробела.
+TAG = re.compile(r"(?<!\S)#(\w+)")
+MENTION = re.compile(r"(?<!\S)@([\w.@+-]+)")
+TAG_MAX_LENGTH = Tag._meta.get_field("name").max_length
+
+
+def normalize_tag(name):
+    return name.lower()
+
+
+def parse(text):
+    """Теги (в нижнем регистре) и имена упомянутых пользователей."""
+    tags = {
+        normalize_tag(name)
+        for name in TAG.findall(text)
+        if len(name) <= TAG_MAX_LENGTH
+    }
+    # Точка в конце — конец предложения, а не часть имени.
+    usernames = {name.rstrip(".") for name in MENTION.findall(text)}
+    usernames.discard("")
+    return tags, usernames
+
+
+def _tag_ids(names):
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    return dict(Tag.objects.filter(name__in=names).values_list("name", "pk"))
+
+
+def _user_ids(usernames):
+    if not usernames:
+        return {}
+    return dict(
+        User.objects.filter(username__in=usernames).values_list(
+            "username", "pk"
+        )
+    )
+
+
+def _sync(model, field, wanted):
+    """Приводит строки ``model`` к парам ``wanted``: {пост: {id: дата}}."""
+    existing = {}
+    for post_id, value in model.objects.filter(
+        post_id__in=wanted
+    ).values_list("post_id", field):
+        existing.setdefault(post_id, set()).add(value)
+    rows = []
+    for post_id, values in wanted.items():
+        current = existing.get(post_id, set())
+        stale = current - values.keys()
+        if stale:
+            model.objects.filter(
+                post_id=post_id, **{f"{field}__in": stale}
+            ).delete()
+        rows += [
+            model(post_id=post_id, pub_date=pub_date, **{field: value})
+            for value, pub_date in values.items()
+            if value not in current
+        ]
+    model.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def index_rows(rows):
+    """Индексирует тройки (id поста, текст, дата публикации) одной пачкой.
+
+    Теги и пользователи всей пачки разрешаются общими запросами, так что
+    число запросов не зависит от размера пачки, кроме удаления устаревших
+    строк у отредактированных постов.
+    """
+    parsed = {
+        post_id: (parse(text), pub_date) for post_id, text, pub_date in rows
+    }
+    tag_ids = _tag_ids(
+        set().union(*(tags for (tags, _), _ in parsed.values()))
+    )
+    user_ids = _user_ids(
+        set().union(*(names for (_, names), _ in parsed.values()))
+    )
+    tagged = {}
+    mentioned = {}
+    for post_id, ((tags, usernames), pub_date) in parsed.items():
+        tagged[post_id] = {tag_ids[name]: pub_date for name in tags}
+        mentioned[post_id] = {
+            user_ids[name]: pub_date for name in usernames if name in user_ids
+        }
+    return _sync(PostTag, "tag_id", tagged) + _sync(
+        Mention, "user_id", mentioned
+    )
+
+
+def index(post, created=False):
+    """Обновляет теги и упоминания поста после сохранения."""
+    if created and not any(parse(post.text)):
+        return 0
+    return index_rows([(post.pk, post.text, post.pub_date)])
+
+
+def backfill(batch_size=1000):
+    """Индексирует все посты пачками по ``batch_size`` в порядке id.
+
+    В памяти одновременно только одна пачка текстов, а чтение по ключу
+    ``pk > последний`` не замедляется к концу таблицы, как OFFSET.
+    """
+    last = 0
+    created = 0
+    while True:
+        rows = list(
+            Post.objects.filter(pk__gt=last)
+            .order_by("pk")
+            .values_list("pk", "text", "pub_date")[:batch_size]
+        )
+        if not rows:
+            return created
+        created += index_rows(rows)
+        last = rows[-1][0]
+
+
+def _feed(posts, relation, per_page):
+    posts = posts.annotate(
+        feed_date=F(f"{relation}__pub_date"),
+        feed_key=F(f"{relation}__post_id"),
+    ).select_related("author", "group")
+    return CursorPaginator(
+        posts, per_page, date_field="feed_date", key_field="feed_key"
+    )
+
+
+def tag_paginator(tag, per_page):
+    """Паджинатор постов с тегом по индексу ``PostTag``."""
+    posts = Post.objects.filter(tag_entries__tag=tag)
+    return _feed(posts, "tag_entries", per_page)
+
+
+def mentions_paginator(user, per_page):
+    """Паджинатор постов, где упомянут пользователь."""
+    posts = Post.objects.filter(mentions__user=user)
+    return _feed(posts, "mentions", per_page)
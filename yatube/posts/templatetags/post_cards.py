@@ -0,0 +1,18 @@
+from django import template
+
+from posts import cards, thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Отрисованные карточки постов страницы ленты."""
+    return cards.render(posts)
+
+
+@register.simple_tag
+def post_picture(post):
+    """Адаптивная картинка поста или ``None``, если картинки нет."""
+    thumbnails.attach([post])
+    return post.picture
@@ -0,0 +1,11 @@
+from django import template
+
+from posts import search
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+    """Фрагмент результата поиска с подсвеченными словами."""
+    return search.highlight(snippet)
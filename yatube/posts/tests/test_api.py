@@ -0,0 +1,253 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import QueryBudgetTestMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTest(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username="Stas", first_name="Станислав"
+        )
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f"Пост {number}", group=cls.group
+            )
+            for number in range(3)
+        ]
+        cls.post = cls.posts[-1]
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.reader, text="Комментарий"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ApiTest.reader)
+
+    def test_post_detail_embeds_author_and_group(self):
+        url = reverse("api:post_detail", kwargs={"post_id": self.post.pk})
+        response = self.assertWithinQueryBudget(self.guest_client, url)
+        data = response.json()
+        self.assertEqual(data["text"], "Пост 2")
+        self.assertEqual(data["comments_count"], 1)
+        self.assertIsNone(data["image"])
+        self.assertEqual(
+            data["author"],
+            {
+                "id": self.author.pk,
+                "username": "Stas",
+                "full_name": "Станислав",
+                "url": "/profile/Stas/",
+            },
+        )
+        self.assertEqual(data["group"]["slug"], "test-slug")
+        self.assertEqual(data["group"]["url"], "/group/test-slug/")
+        self.assertIn("Станислав".encode(), response.content)
+
+    def test_sparse_fieldset_reads_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.guest_client.get(
+                reverse("api:index"), {"fields": "id,author.username"}
+            )
+        self.assertEqual(
+            response.json()["results"][0],
+            {"id": self.post.pk, "author": {"username": "Stas"}},
+        )
+        sql = context.captured_queries[-1]["sql"]
+        self.assertNotIn('"posts_post"."text"', sql)
+        self.assertNotIn("posts_group", sql)
+
+    def test_unknown_field(self):
+        response = self.guest_client.get(
+            reverse("api:index"), {"fields": "id,author.password"}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("author.password", response.json()["detail"])
+
+    @override_settings(PER_PAGE_COUNT=2)
+    def test_feeds_cursor_pagination(self):
+        """Ленты проходятся по ссылкам ``next`` от новых постов к старым."""
+        expected = [post.pk for post in reversed(self.posts)]
+        urls = (
+            (self.guest_client, reverse("api:index")),
+            (
+                self.guest_client,
+                reverse("api:group_posts", kwargs={"slug": "test-slug"}),
+            ),
+            (
+                self.guest_client,
+                reverse("api:profile", kwargs={"username": "Stas"}),
+            ),
+            (self.reader_client, reverse("api:follow_index")),
+        )
+        for client, url in urls:
+            with self.subTest(url=url):
+                seen = []
+                while url:
+                    data = self.assertWithinQueryBudget(client, url).json()
+                    seen += [item["id"] for item in data["results"]]
+                    url = data["next"]
+                self.assertEqual(seen, expected)
+
+    def test_comments(self):
+        url = reverse("api:post_comments", kwargs={"post_id": self.post.pk})
+        results = self.assertWithinQueryBudget(
+            self.guest_client, url
+        ).json()["results"]
+        self.assertEqual(
+            [(item["text"], item["author"]["username"]) for item in results],
+            [("Комментарий", "Reader")],
+        )
+
+    def test_not_found(self):
+        urls = (
+            reverse("api:group_posts", kwargs={"slug": "missing"}),
+            reverse("api:profile", kwargs={"username": "missing"}),
+            reverse("api:post_detail", kwargs={"post_id": 0}),
+            reverse("api:post_comments", kwargs={"post_id": 0}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn("detail", response.json())
+
+    def test_follow_requires_login(self):
+        response = self.guest_client.get(reverse("api:follow_index"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_conditional_get(self):
+        """Повторный запрос с ``ETag`` получает 304 без тела."""
+        for client, url in (
+            (self.guest_client, reverse("api:index")),
+            (self.reader_client, reverse("api:follow_index")),
+            (
+                self.guest_client,
+                reverse("api:post_comments", kwargs={"post_id": self.post.pk}),
+            ),
+        ):
+            with self.subTest(url=url):
+                etag = client.get(url)["ETag"]
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b"")
+
+    def test_author_and_group_edits_change_etag(self):
+        """Правка автора или группы не дает 304 со старыми данными."""
+        urls = (
+            reverse("api:index"),
+            reverse("api:group_posts", kwargs={"slug": "test-slug"}),
+            reverse("api:profile", kwargs={"username": "Stas"}),
+            reverse("api:post_detail", kwargs={"post_id": self.post.pk}),
+        )
+        etags = {url: self.guest_client.get(url)["ETag"] for url in urls}
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = "Новое название"
+        group.save()
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = "Стас"
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn("Новое название".encode(), response.content)
+                self.assertIn("Стас".encode(), response.content)
+
+    def test_commenter_edit_changes_comments_etag(self):
+        url = reverse("api:post_comments", kwargs={"post_id": self.post.pk})
+        etag = self.guest_client.get(url)["ETag"]
+        reader = User.objects.get(pk=self.reader.pk)
+        reader.first_name = "Читатель"
+        reader.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Читатель".encode(), response.content)
+
+    def test_read_only(self):
+        response = self.reader_client.post(reverse("api:index"))
+        self.assertEqual(response.status_code, 405)
+
+    def test_posts_batch_keeps_request_order(self):
+        """Порядок запроса, повторы и пометки для ненайденных id."""
+        first, second = self.posts[0], self.posts[1]
+        url = reverse("api:posts_batch")
+        query = f"?ids={second.pk},0,{first.pk},{second.pk}&fields=id,text"
+        response = self.assertWithinQueryBudget(self.guest_client, url + query)
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {"id": second.pk, "text": "Пост 1"},
+                {"id": 0, "error": "not_found"},
+                {"id": first.pk, "text": "Пост 0"},
+                {"id": second.pk, "text": "Пост 1"},
+            ],
+        )
+
+    def test_posts_batch_uses_cached_cards(self):
+        url = reverse("api:posts_batch")
+        query = {"ids": f"{self.post.pk}", "fields": "text,author.username"}
+        self.guest_client.get(url, query)
+        with self.assertNumQueries(1):
+            self.guest_client.get(url, query)
+        self.post.text = "Правка"
+        self.post.save()
+        result = self.guest_client.get(url, query).json()["results"][0]
+        self.assertEqual(
+            result, {"text": "Правка", "author": {"username": "Stas"}}
+        )
+
+    def test_posts_batch_cards_follow_comments_and_author(self):
+        """Счетчик комментариев и автор в карточке не устаревают."""
+        url = reverse("api:posts_batch")
+        query = {
+            "ids": f"{self.post.pk}",
+            "fields": "comments_count,author.full_name",
+        }
+        self.guest_client.get(url, query)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Еще один"
+        )
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = "Стас"
+        author.save()
+        result = self.guest_client.get(url, query).json()["results"][0]
+        self.assertEqual(
+            result, {"comments_count": 2, "author": {"full_name": "Стас"}}
+        )
+
+    def test_users_batch(self):
+        url = reverse("api:users_batch")
+        query = f"?ids={self.reader.pk},0&fields=username"
+        response = self.assertWithinQueryBudget(self.guest_client, url + query)
+        self.assertEqual(
+            response.json()["results"],
+            [{"username": "Reader"}, {"id": 0, "error": "not_found"}],
+        )
+
+    @override_settings(API_BATCH_MAX_IDS=2)
+    def test_batch_rejects_bad_ids(self):
+        for ids in ("", "1,x", "1,2,3"):
+            with self.subTest(ids=ids):
+                response = self.guest_client.get(
+                    reverse("api:posts_batch"), {"ids": ids}
+                )
+                self.assertEqual(response.status_code, 400)
@@ -0,0 +1,146 @@
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, RequestFactory, TransactionTestCase
+from django.urls import reverse
+
+from posts import autocomplete
+from posts.models import Group
+
+User = get_user_model()
+
+
+class AutocompleteTest(TransactionTestCase):
+    """Индекс обновляется после коммита, поэтому транзакции настоящие."""
+
+    def setUp(self):
+        cache.clear()
+        autocomplete.reset()
+        self.user = User.objects.create_user(
+            username="stas", first_name="Станислав", last_name="Пётров"
+        )
+        self.other = User.objects.create_user(username="stepan")
+        self.group = Group.objects.create(
+            title="Любители котов", slug="cats", description="Про котов"
+        )
+        self.guest_client = Client()
+
+    def found(self, query, kinds=autocomplete.KINDS):
+        return [
+            (item.kind, item.pk)
+            for item in autocomplete.lookup(query, kinds)
+        ]
+
+    def test_prefix_lookup(self):
+        """Префикс username, имени, фамилии, названия группы и slug."""
+        user = (autocomplete.USER, self.user.pk)
+        group = (autocomplete.GROUP, self.group.pk)
+        self.assertCountEqual(
+            self.found("st"), [user, (autocomplete.USER, self.other.pk)]
+        )
+        self.assertEqual(self.found("ПЕТР"), [user])
+        self.assertEqual(self.found("станислав петров"), [user])
+        self.assertEqual(self.found("кот"), [group])
+        self.assertEqual(self.found("cat"), [group])
+
+    def test_typo_lookup(self):
+        self.assertEqual(
+            self.found("станилсав", (autocomplete.USER,)),
+            [(autocomplete.USER, self.user.pk)],
+        )
+        self.assertEqual(
+            self.found("лубители"), [(autocomplete.GROUP, self.group.pk)]
+        )
+
+    def test_saves_update_loaded_index(self):
+        """Сохранения меняют построенный индекс без запросов к базе."""
+        autocomplete.get_index()
+        user = User.objects.create_user(username="newcomer")
+        self.group.title = "Собачники"
+        self.group.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.found("newc"), [(autocomplete.USER, user.pk)]
+            )
+            self.assertEqual(self.found("любители"), [])
+            self.assertEqual(
+                self.found("собач"), [(autocomplete.GROUP, self.group.pk)]
+            )
+        user.delete()
+        self.assertEqual(self.found("newc"), [])
+
+    def test_rolled_back_save_leaves_index_unchanged(self):
+        autocomplete.get_index()
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                User.objects.create_user(username="phantom")
+                raise RuntimeError
+        self.assertEqual(self.found("phant"), [])
+
+    def test_changes_from_other_process(self):
+        """Изменения из журнала в кэше перечитываются из базы."""
+        autocomplete.get_index()
+        User.objects.filter(pk=self.other.pk).update(username="renamed")
+        version = cache.incr(autocomplete.VERSION_KEY)
+        cache.set(
+            autocomplete._change_key(version),
+            (autocomplete.USER, self.other.pk),
+        )
+        self.assertEqual(
+            self.found("renamed"), [(autocomplete.USER, self.other.pk)]
+        )
+        self.assertNotIn((autocomplete.USER, self.other.pk), self.found("st"))
+        # Пропуск в журнале ведет к полной перестройке.
+        User.objects.filter(pk=self.other.pk).update(username="again")
+        cache.incr(autocomplete.VERSION_KEY)
+        self.assertEqual(
+            self.found("again"), [(autocomplete.USER, self.other.pk)]
+        )
+
+    def test_endpoint(self):
+        response = self.guest_client.get(
+            reverse("posts:autocomplete"), {"q": "кот", "type": "group"}
+        )
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "type": "group",
+                    "id": self.group.pk,
+                    "label": "Любители котов",
+                    "value": "cats",
+                    "url": reverse(
+                        "posts:group_posts", kwargs={"slug": "cats"}
+                    ),
+                }
+            ],
+        )
+        response = self.guest_client.get(
+            reverse("posts:autocomplete"), {"q": "кот", "type": "user"}
+        )
+        self.assertEqual(response.json()["results"], [])
+
+    def test_admin_autocomplete_uses_index(self):
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="pass"
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse("admin:auth_user_autocomplete"), {"term": "stpan"}
+        )
+        self.assertEqual(
+            [item["id"] for item in response.json()["results"]],
+            [str(self.other.pk)],
+        )
+
+    def test_admin_changelist_search_keeps_search_fields(self):
+        """Поиск в списке пользователей по-прежнему находит и по email."""
+        self.other.email = "stepan@yatube.ru"
+        self.other.save()
+        request = RequestFactory().get("/")
+        queryset, use_distinct = site._registry[User].get_search_results(
+            request, User.objects.all(), "stepan@yatube"
+        )
+        self.assertEqual(list(queryset), [self.other])
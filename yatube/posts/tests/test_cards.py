@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username="Stas", email="stas@example.com", password="pass"
+        )
+        cls.other_group = Group.objects.create(
+            title="Другая группа", slug="other-slug", description="Описание"
+        )
+        cls.post = Post.objects.create(author=cls.user, text="Первый пост")
+        cls.other = Post.objects.create(author=cls.user, text="Второй пост")
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(PostCardsTest.user)
+
+    def render_count(self):
+        """Число карточек, нарисованных при построении ленты."""
+        posts = Post.objects.select_related("author", "group")
+        with mock.patch(
+            "posts.cards.render_to_string", wraps=cards.render_to_string
+        ) as render:
+            cards.render(posts)
+        return render.call_count
+
+    def test_cards_rendered_once(self):
+        """Поколения областей и карточки берутся из кэша двумя выборками."""
+        self.assertEqual(self.render_count(), 2)
+        with mock.patch.object(
+            cards.cache, "get_many", wraps=cards.cache.get_many
+        ) as get_many:
+            self.assertEqual(self.render_count(), 0)
+        self.assertEqual(get_many.call_count, 2)
+
+    def test_post_edit_invalidates_only_its_card(self):
+        """Правка поста перерисовывает только его карточку."""
+        self.render_count()
+        self.authorized_client.post(
+            reverse("posts:post_edit", kwargs={"post_id": self.post.pk}),
+            {"text": "Исправленный пост"},
+        )
+        self.assertEqual(self.render_count(), 1)
+        response = self.authorized_client.get(reverse("posts:index"))
+        self.assertContains(response, "Исправленный пост")
+
+    def test_admin_group_change_invalidates_card(self):
+        """Смена группы в админке перерисовывает карточку поста."""
+        self.render_count()
+        self.authorized_client.post(
+            reverse("admin:posts_post_change", args=(self.post.pk,)),
+            {
+                "text": self.post.text,
+                "author": self.user.pk,
+                "group": self.other_group.pk,
+            },
+        )
+        self.assertEqual(self.render_count(), 1)
+        response = self.authorized_client.get(reverse("posts:index"))
+        self.assertContains(response, "все записи группы Другая группа")
+
+    def test_author_and_group_edits_rerender_cards(self):
+        """Правка имени автора и названия группы видна в готовой ленте."""
+        group = Group.objects.create(
+            title="Старое название", slug="cards-slug", description="Описание"
+        )
+        Post.objects.create(author=self.user, text="В группе", group=group)
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "cards-slug"}),
+        )
+        guest_client = Client()
+        for url in urls:
+            guest_client.get(url)
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = "Станислав"
+        author.save()
+        group.title = "Новое название"
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = guest_client.get(url)
+                self.assertContains(response, "Станислав")
+                self.assertContains(response, "Новое название")
+                self.assertNotContains(response, "Старое название")
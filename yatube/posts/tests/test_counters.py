@@ -0,0 +1,103 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Stas")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.post = Post.objects.create(author=cls.author, text="Пост")
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(CountersTest.reader)
+
+    def test_counters_follow_writes(self):
+        """Счетчики меняются при постах, комментариях и подписках."""
+        Post.objects.create(author=self.author, text="Второй")
+        self.reader_client.post(
+            reverse("posts:add_comment", kwargs={"post_id": self.post.pk}),
+            {"text": "Комментарий"},
+        )
+        self.reader_client.get(
+            reverse("posts:profile_follow", kwargs={"username": "Stas"})
+        )
+        author_stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).following_count, 1
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.reader_client.get(
+            reverse("posts:profile_unfollow", kwargs={"username": "Stas"})
+        )
+        Post.objects.filter(text="Второй").delete()
+        author_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 0)
+
+    def test_profile_read_does_not_write(self):
+        """У нового пользователя уже есть счетчики: профиль только читает."""
+        user = User.objects.create_user(username="Newcomer")
+        self.assertTrue(UserStats.objects.filter(user=user).exists())
+        with CaptureQueriesContext(connection) as context:
+            self.reader_client.get(
+                reverse("posts:profile", kwargs={"username": "Newcomer"})
+            )
+        self.assertFalse(
+            [
+                query["sql"]
+                for query in context.captured_queries
+                if query["sql"].startswith(("INSERT", "UPDATE"))
+                and "posts_userstats" in query["sql"]
+            ]
+        )
+
+    def test_fill_user_stats_migration(self):
+        """Миграция создает недостающие строки с посчитанными значениями."""
+        UserStats.objects.all().delete()
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.all().delete()
+        migration = import_module("posts.migrations.0018_fill_user_stats")
+        migration.fill_user_stats(django_apps, None)
+        self.assertEqual(
+            list(
+                UserStats.objects.order_by("user_id").values_list(
+                    "user_id",
+                    "posts_count",
+                    "followers_count",
+                    "following_count",
+                )
+            ),
+            [(self.author.pk, 1, 1, 0), (self.reader.pk, 0, 0, 1)],
+        )
+
+    def test_reconcile_command_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Comment.objects.create(post=self.post, author=self.reader, text="1")
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.filter(user=self.author).update(
+            posts_count=7, followers_count=0
+        )
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        call_command("reconcile_counters", stdout=StringIO())
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
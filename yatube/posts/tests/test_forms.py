@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 from django.conf import settings
@@ -12,6 +13,11 @@ TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 User = get_user_model()
 
 
+def hashed_name(content):
+    digest = hashlib.sha256(content).hexdigest()
+    return f"posts/{digest[:2]}/{digest}.gif"
+
+
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostCreateFormTests(TestCase):
     @classmethod
@@ -65,7 +71,7 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count + 1)
         self.assertTrue(
             Post.objects.filter(
-                text="Тестовый текст", image="posts/small.gif"
+                text="Тестовый текст", image=hashed_name(small_gif)
             ).exists()
         )
 
@@ -106,6 +112,6 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(Post.objects.count(), posts_count)
         self.assertTrue(
             Post.objects.filter(
-                text="Тестовый текст change", image="posts/big.gif"
+                text="Тестовый текст change", image=hashed_name(big_gif)
             ).exists()
         )
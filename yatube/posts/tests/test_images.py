@@ -0,0 +1,227 @@
+import hashlib
+import multiprocessing
+import resource
+import shutil
+import os
+import tempfile
+from io import BytesIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from core import tasks
+from core.models import StoredFile
+from posts.forms import PostForm
+from posts.images import ORIENTATION
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+def make_jpeg(width, height, orientation=None):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[ORIENTATION] = orientation
+    Image.linear_gradient("L").resize((width, height)).convert("RGB").save(
+        buffer, "JPEG", exif=exif
+    )
+    return buffer.getvalue()
+
+
+def _validate_upload(content, queue):
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    form = PostForm(
+        {"text": "Пост"},
+        {"image": SimpleUploadedFile("big.jpg", content, "image/jpeg")},
+    )
+    form.is_valid()
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((after - before) * 1024)
+
+
+def upload_peak_rss(content):
+    """Прирост пикового RSS при разборе загрузки, в байтах."""
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    process = context.Process(target=_validate_upload, args=(content, queue))
+    process.start()
+    growth = queue.get(timeout=60)
+    process.join()
+    return growth
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Stas")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ImageUploadTest.user)
+
+    def upload(self, content, text="Пост с картинкой"):
+        self.authorized_client.post(
+            reverse("posts:post_create"),
+            {
+                "text": text,
+                "image": SimpleUploadedFile(
+                    "photo.jpg", content, "image/jpeg"
+                ),
+            },
+        )
+        return Post.objects.get(text=text)
+
+    def test_metadata_stored_on_upload(self):
+        """Размеры, объем и хэш картинки сохраняются при загрузке."""
+        content = make_jpeg(300, 200)
+        post = self.upload(content)
+        self.assertEqual((post.image_width, post.image_height), (300, 200))
+        self.assertEqual(post.image_size, len(content))
+        self.assertEqual(
+            post.image_hash, hashlib.sha256(content).hexdigest()
+        )
+
+    def test_exif_orientation_normalized(self):
+        """Кадр с поворотом в EXIF сохраняется уже развернутым."""
+        post = self.upload(make_jpeg(300, 200, orientation=6))
+        self.assertEqual((post.image_width, post.image_height), (200, 300))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (200, 300))
+            self.assertNotIn(ORIENTATION, image.getexif())
+        with open(post.image.path, "rb") as stored:
+            self.assertEqual(
+                post.image_hash, hashlib.sha256(stored.read()).hexdigest()
+            )
+
+    def test_multi_frame_image_kept_untouched(self):
+        """Многокадровый файл не режется до первого кадра при повороте."""
+        buffer = BytesIO()
+        frames = [
+            Image.new("RGB", (40, 20), color) for color in ("red", "blue")
+        ]
+        frames[0].save(
+            buffer,
+            "TIFF",
+            save_all=True,
+            append_images=frames[1:],
+            tiffinfo={ORIENTATION: 6},
+        )
+        post = self.upload(buffer.getvalue())
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        with open(post.image.path, "rb") as stored:
+            self.assertEqual(stored.read(), buffer.getvalue())
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.n_frames, 2)
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые картинки хранятся одним файлом до последней ссылки."""
+        content = make_jpeg(300, 200)
+        first = self.upload(content, "Первый пост")
+        second = self.upload(content, "Второй пост")
+        self.assertEqual(first.image.name, second.image.name)
+        path = first.image.path
+        first.delete()
+        tasks.run_pending()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertTrue(os.path.exists(path))
+        tasks.run_pending()
+        self.assertFalse(os.path.exists(path))
+
+    def test_reused_file_survives_pending_delete(self):
+        """Файл, снова сохраненный до удаления, остается на диске.
+
+        Пост со второй загрузкой еще не зафиксирован, поэтому в базе на файл
+        ссылается только счетчик ``StoredFile``.
+        """
+        content = make_jpeg(300, 200)
+        first = self.upload(content, "Первый пост")
+        path = first.image.path
+        first.delete()
+        storage = Post._meta.get_field("image").storage
+        name = storage.save("posts/again.jpg", ContentFile(content))
+        self.assertEqual(name, first.image.name)
+        tasks.run_pending()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get(name=name).refs, 1)
+
+    def test_same_image_reupload_keeps_one_reference(self):
+        """Повторная загрузка тех же байтов не оставляет лишней ссылки."""
+        content = make_jpeg(300, 200)
+        post = self.upload(content)
+        self.authorized_client.post(
+            reverse("posts:post_edit", kwargs={"post_id": post.pk}),
+            {
+                "text": post.text,
+                "image": SimpleUploadedFile(
+                    "again.jpg", content, "image/jpeg"
+                ),
+            },
+        )
+        post.refresh_from_db()
+        self.assertEqual(StoredFile.objects.get(name=post.image.name).refs, 1)
+        path = post.image.path
+        post.delete()
+        tasks.run_pending()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.exists())
+
+    def test_replaced_image_released(self):
+        """Замененная при редактировании картинка удаляется с диска."""
+        post = self.upload(make_jpeg(300, 200))
+        path = post.image.path
+        self.authorized_client.post(
+            reverse("posts:post_edit", kwargs={"post_id": post.pk}),
+            {
+                "text": post.text,
+                "image": SimpleUploadedFile(
+                    "other.jpg", make_jpeg(200, 100), "image/jpeg"
+                ),
+            },
+        )
+        tasks.run_pending()
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.path, path)
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(post.image.path))
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=10000)
+    def test_pixel_cap(self):
+        """Картинка больше лимита пикселей отклоняется без декодирования."""
+        form = PostForm(
+            {"text": "Пост"},
+            {
+                "image": SimpleUploadedFile(
+                    "big.jpg", make_jpeg(300, 200), "image/jpeg"
+                )
+            },
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("image", form.errors)
+
+    @skipUnless(
+        "fork" in multiprocessing.get_all_start_methods(), "Нужен fork"
+    )
+    def test_upload_peak_rss_is_bounded(self):
+        """Пиковая память загрузки ограничена и не растет без поворота."""
+        width, height = 6000, 4000
+        decoded = width * height * 3
+        content = make_jpeg(width, height)
+        self.assertLess(upload_peak_rss(content), decoded // 4)
+        rotated = make_jpeg(width, height, orientation=6)
+        self.assertLess(upload_peak_rss(rotated), decoded * 4)
@@ -0,0 +1,86 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import NEXT, encode_cursor
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r"SCAN (TABLE )?posts_\w+( AS \w+)?$")
+
+
+@skipUnless(connection.vendor == "sqlite", "Планы запросов SQLite")
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Stas")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Тестовый текст", group=cls.group
+        )
+        Comment.objects.create(post=cls.post, author=cls.user, text="1")
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryPlanTest.reader)
+
+    def plans(self, url):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query["sql"].startswith("SELECT"):
+                    continue
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plans += [row[-1] for row in cursor.fetchall()]
+        return plans
+
+    def test_feeds_use_composite_indexes(self):
+        """Ленты читаются по составным индексам без полного скана."""
+        cursor_url = "?cursor=" + encode_cursor(
+            NEXT, 2, self.post.pub_date, self.post.pk
+        )
+        pages = {
+            reverse("posts:index"): "post_pub_date_id_idx",
+            reverse("posts:index") + cursor_url: "post_pub_date_id_idx",
+            reverse(
+                "posts:group_posts", kwargs={"slug": "test-slug"}
+            ): "post_group_pub_date_idx",
+            reverse(
+                "posts:profile", kwargs={"username": "Stas"}
+            ): "post_author_pub_date_idx",
+            reverse(
+                "posts:post_detail", kwargs={"post_id": self.post.pk}
+            ): "comment_post_created_idx",
+            reverse("posts:follow_index"): "timeline_user_pub_date_idx",
+        }
+        for url, index in pages.items():
+            with self.subTest(url=url):
+                plans = self.plans(url)
+                self.assertTrue(any(index in plan for plan in plans), plans)
+                for plan in plans:
+                    self.assertNotIn("USE TEMP B-TREE", plan)
+                    self.assertIsNone(FULL_SCAN.search(plan), plan)
+
+    def test_follow_lookup_uses_unique_index(self):
+        """Проверка подписки идет по уникальному индексу (user, author)."""
+        queryset = Follow.objects.filter(user=self.reader, author=self.user)
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+        self.assertIn("user_id=? AND author_id=?", plan)
@@ -0,0 +1,168 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Stas")
+        cls.other = User.objects.create_user(username="Other")
+        cls.group = Group.objects.create(
+            title="Коты", slug="cats", description="Про котов"
+        )
+        cls.once = Post.objects.create(
+            author=cls.author, text="Один Котик гуляет сам по себе"
+        )
+        cls.twice = Post.objects.create(
+            author=cls.other,
+            text="Котик <b>и</b> еще котик",
+            group=cls.group,
+        )
+        Post.objects.create(author=cls.author, text="Собаки")
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def found(self, text, **filters):
+        paginator = search.SearchPaginator(search.search(text, **filters), 50)
+        return [post.pk for post in paginator.cursor_page()]
+
+    def test_ranked_prefix_search(self):
+        """Поиск без учета регистра, по префиксу, лучшие совпадения выше."""
+        self.assertEqual(
+            self.found("КОТИК"), [self.twice.pk, self.once.pk]
+        )
+        self.assertEqual(self.found("гуля"), [self.once.pk])
+        self.assertEqual(self.found("котик сам"), [self.once.pk])
+
+    def test_syntax_in_query_is_ignored(self):
+        self.assertEqual(self.found('"котик*" -('), self.found("котик"))
+        self.assertEqual(self.found("!!!"), [])
+
+    def test_index_follows_changes(self):
+        """Триггеры обновляют индекс при любом изменении постов."""
+        Post.objects.filter(pk=self.once.pk).update(text="Теперь щенок")
+        self.assertEqual(self.found("щенок"), [self.once.pk])
+        self.assertEqual(self.found("гуляет"), [])
+        Post.objects.filter(pk=self.twice.pk).delete()
+        self.assertEqual(self.found("котик"), [])
+
+    def test_filters(self):
+        self.assertEqual(
+            self.found("котик", group=self.group), [self.twice.pk]
+        )
+        self.assertEqual(
+            self.found("котик", author=self.author), [self.once.pk]
+        )
+
+    def test_view_highlights_escaped_snippet(self):
+        response = self.guest_client.get(
+            reverse("posts:post_search"), {"q": "котик", "author": "Other"}
+        )
+        self.assertEqual(list(response.context["page_obj"]), [self.twice])
+        self.assertContains(
+            response, "<mark>Котик</mark> &lt;b&gt;и&lt;/b&gt; еще"
+        )
+
+    def test_view_unknown_author(self):
+        response = self.guest_client.get(
+            reverse("posts:post_search"), {"q": "котик", "author": "nobody"}
+        )
+        self.assertIsNone(response.context["page_obj"])
+        self.assertTrue(response.context["form"].errors)
+
+    @override_settings(PER_PAGE_COUNT=1)
+    def test_view_cursor_pagination(self):
+        """Курсор проходит все результаты по порядку, сохраняя запрос."""
+        url = reverse("posts:post_search")
+        params = {"q": "котик"}
+        seen = []
+        while True:
+            response = self.guest_client.get(url, params)
+            page_obj = response.context["page_obj"]
+            seen += [post.pk for post in page_obj]
+            cursor = page_obj.paginator.next_cursor
+            if cursor is None:
+                break
+            self.assertContains(response, "q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA&")
+            params["cursor"] = cursor
+        self.assertEqual(seen, self.found("котик"))
+
+    @override_settings(SEARCH_RANK_WINDOW=1, PER_PAGE_COUNT=1)
+    def test_matches_outside_rank_window_are_paged(self):
+        """Совпадения старше окна идут за ранжированными, а не теряются."""
+        newer = Post.objects.create(author=self.author, text="Котик")
+        url = reverse("posts:post_search")
+        response = self.guest_client.get(url, {"q": "котик"})
+        params = QueryDict(response.context["query"]).dict()
+        self.assertEqual(
+            search.unsign_boundary(params["window"], "котик"), newer.pk
+        )
+        page_obj = response.context["page_obj"]
+        seen = [post.pk for post in page_obj]
+        while page_obj.paginator.next_cursor:
+            params["cursor"] = page_obj.paginator.next_cursor
+            page_obj = self.guest_client.get(url, params).context["page_obj"]
+            seen += [post.pk for post in page_obj]
+        self.assertEqual(seen, [newer.pk, self.twice.pk, self.once.pk])
+        params["cursor"] = page_obj.paginator.previous_cursor
+        response = self.guest_client.get(url, params)
+        self.assertEqual(list(response.context["page_obj"]), [self.twice])
+
+    def test_window_from_link_is_kept(self):
+        """Подписанная граница окна из ссылки не пересчитывается."""
+        response = self.guest_client.get(
+            reverse("posts:post_search"),
+            {"q": "котик", "window": search.sign_boundary(0, "котик")},
+        )
+        self.assertEqual(
+            list(response.context["page_obj"]), [self.twice, self.once]
+        )
+        params = QueryDict(response.context["query"])
+        self.assertEqual(search.unsign_boundary(params["window"], "котик"), 0)
+
+    @override_settings(SEARCH_RANK_WINDOW=1)
+    def test_unsigned_window_is_ignored(self):
+        """Граница без подписи или от другого запроса пересчитывается."""
+        for window in ("0", search.sign_boundary(0, "гуляет")):
+            with self.subTest(window=window):
+                response = self.guest_client.get(
+                    reverse("posts:post_search"),
+                    {"q": "котик", "window": window},
+                )
+                params = QueryDict(response.context["query"])
+                self.assertEqual(
+                    search.unsign_boundary(params["window"], "котик"),
+                    self.twice.pk,
+                )
+
+    def test_admin_search_uses_index(self):
+        request = RequestFactory().get("/")
+        queryset, use_distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), "котик"
+        )
+        self.assertIn("MATCH", str(queryset.query))
+        self.assertCountEqual(queryset, [self.once, self.twice])
+
+    def test_rebuild_command_restores_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {search.TABLE}_insert")
+        post = Post.objects.create(author=self.author, text="Хомяк")
+        self.assertEqual(self.found("хомяк"), [])
+        call_command("rebuild_search_index", stdout=StringIO())
+        self.assertEqual(self.found("хомяк"), [post.pk])
+        other = Post.objects.create(author=self.author, text="Хомяк")
+        self.assertEqual(self.found("хомяк"), [other.pk, post.pk])
@@ -0,0 +1,104 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import tags
+from posts.models import Mention, Post, PostTag, Tag
+
+User = get_user_model()
+
+
+class TagIndexTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Stas")
+        cls.reader = User.objects.create_user(username="Reader")
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(TagIndexTest.reader)
+
+    def tagged(self, post):
+        return set(
+            PostTag.objects.filter(post=post).values_list(
+                "tag__name", flat=True
+            )
+        )
+
+    def test_parse(self):
+        """Теги без учета регистра, адреса и якоря ссылок не считаются."""
+        self.assertEqual(
+            tags.parse("#Кот и #кот, @Reader. mail@host.ru site.ru/#anchor"),
+            ({"кот"}, {"Reader"}),
+        )
+
+    def test_save_indexes_and_edit_reindexes(self):
+        post = Post.objects.create(
+            author=self.author, text="#cats #dogs @Reader @nobody"
+        )
+        self.assertEqual(self.tagged(post), {"cats", "dogs"})
+        self.assertEqual(
+            list(Mention.objects.values_list("post", "user")),
+            [(post.pk, self.reader.pk)],
+        )
+        post.text = "#cats #birds"
+        post.save()
+        self.assertEqual(self.tagged(post), {"cats", "birds"})
+        self.assertFalse(Mention.objects.exists())
+
+    @override_settings(PER_PAGE_COUNT=2)
+    def test_tag_feed_cursor_pagination(self):
+        """Лента тега идет от новых к старым и проходит все посты."""
+        posts = [
+            Post.objects.create(author=self.author, text=f"#Cats {number}")
+            for number in range(5)
+        ]
+        Post.objects.create(author=self.author, text="Без тега")
+        url = reverse("posts:tag_posts", kwargs={"name": "CATS"})
+        seen = []
+        cursor = None
+        while True:
+            response = self.guest_client.get(
+                url, {"cursor": cursor} if cursor else {}
+            )
+            page_obj = response.context["page_obj"]
+            seen += [post.pk for post in page_obj]
+            cursor = page_obj.paginator.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, [post.pk for post in reversed(posts)])
+
+    def test_unknown_tag_is_404(self):
+        response = self.guest_client.get(
+            reverse("posts:tag_posts", kwargs={"name": "nothing"})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_mentions_feed(self):
+        post = Post.objects.create(author=self.author, text="Привет, @Reader")
+        Post.objects.create(author=self.author, text="Привет, @Stas")
+        response = self.reader_client.get(reverse("posts:mentions"))
+        self.assertEqual(list(response.context["page_obj"]), [post])
+        response = self.guest_client.get(reverse("posts:mentions"))
+        self.assertEqual(response.status_code, 302)
+
+    def test_backfill_command(self):
+        """Команда дозаполняет индекс пачками и не дублирует записи."""
+        posts = [
+            Post.objects.create(author=self.author, text=f"#old{number}")
+            for number in range(3)
+        ]
+        Post.objects.create(author=self.author, text="@Reader")
+        PostTag.objects.all().delete()
+        Mention.objects.all().delete()
+        Tag.objects.all().delete()
+        call_command("backfill_tags", batch_size=2, stdout=StringIO())
+        self.assertEqual(self.tagged(posts[2]), {"old2"})
+        self.assertEqual(PostTag.objects.count(), 3)
+        self.assertEqual(Mention.objects.get().user, self.reader)
+        self.assertEqual(tags.backfill(), 0)
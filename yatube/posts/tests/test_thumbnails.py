@@ -0,0 +1,146 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import tasks
+from core.models import Task
+from posts import cards, thumbnails
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Stas")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ThumbnailsTest.user)
+        self.post = Post.objects.create(
+            author=self.user,
+            text="Пост с картинкой",
+            image=SimpleUploadedFile("small.gif", SMALL_GIF, "image/gif"),
+        )
+
+    def card(self):
+        return cards.render(
+            Post.objects.filter(pk=self.post.pk).select_related("author")
+        )[0]
+
+    def test_placeholder_until_generated(self):
+        """До генерации шаблон показывает заглушку, а не сжимает оригинал."""
+        with mock.patch.object(thumbnails.default.engine, "get_image") as get:
+            self.assertIn(settings.THUMBNAIL_PLACEHOLDER, self.card())
+        get.assert_not_called()
+        self.assertTrue(thumbnails.generate(self.post.image.name))
+        card = self.card()
+        self.assertNotIn(settings.THUMBNAIL_PLACEHOLDER, card)
+        self.assertIn(settings.MEDIA_URL + "cache/", card)
+        self.assertIn('loading="lazy"', card)
+        for width in thumbnails.WIDTHS:
+            self.assertIn(f" {width}w", card)
+        self.assertFalse(thumbnails.generate(self.post.image.name))
+
+    def test_saves_schedule_generation(self):
+        """Новая картинка заказывает миниатюры при любом сохранении."""
+        with mock.patch("posts.signals.thumbnails.schedule_for") as schedule:
+            self.authorized_client.post(
+                reverse("posts:post_create"),
+                {
+                    "text": "Новый пост",
+                    "image": SimpleUploadedFile(
+                        "new.gif", SMALL_GIF, "image/gif"
+                    ),
+                },
+            )
+            self.authorized_client.post(
+                reverse("posts:post_edit", kwargs={"post_id": self.post.pk}),
+                {"text": "Без смены картинки"},
+            )
+            Post.objects.create(
+                author=self.user,
+                text="Из ORM",
+                image=SimpleUploadedFile("orm.gif", SMALL_GIF, "image/gif"),
+            )
+        self.assertEqual(schedule.call_count, 2)
+
+    def test_generation_runs_in_task_queue(self):
+        """Миниатюры создает фоновая задача, а не запрос."""
+        self.assertTrue(
+            Task.objects.filter(name=thumbnails.build.task_name).exists()
+        )
+        self.assertIn(settings.THUMBNAIL_PLACEHOLDER, self.card())
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertNotIn(settings.THUMBNAIL_PLACEHOLDER, self.card())
+
+    def test_batch_lookup_matches_single(self):
+        """Пакетный поиск миниатюр совпадает с поштучным и идет разом."""
+        other = Post.objects.create(
+            author=self.user,
+            text="Еще пост",
+            image=SimpleUploadedFile("other.gif", SMALL_GIF, "image/gif"),
+        )
+        thumbnails.generate(self.post.image.name)
+        names = [self.post.image.name, other.image.name]
+        geometry, options = thumbnails.VARIANTS[-1]
+        single = {
+            name: thumbnails.default.backend.get_thumbnail(
+                name, geometry, **options
+            ).url
+            for name in names
+        }
+        cache.clear()
+        with self.assertNumQueries(1):
+            batch = thumbnails.default.backend.get_thumbnails(
+                names, geometry, **options
+            )
+        self.assertEqual(
+            {name: thumbnail.url for name, thumbnail in batch.items()}, single
+        )
+        with self.assertNumQueries(0):
+            thumbnails.default.backend.get_thumbnails(
+                names, geometry, **options
+            )
+
+    def test_size_report_command(self):
+        """Отчет показывает размеры каждого варианта картинки."""
+        thumbnails.generate(self.post.image.name)
+        out = StringIO()
+        call_command("thumbnail_sizes", stdout=out)
+        for geometry, options in thumbnails.VARIANTS:
+            self.assertIn(geometry, out.getvalue())
+
+    def test_pregenerate_command(self):
+        """Команда создает миниатюры для существующих постов."""
+        out = StringIO()
+        call_command("pregenerate_thumbnails", stdout=out)
+        self.assertIn("1", out.getvalue())
+        self.assertNotIn(settings.THUMBNAIL_PLACEHOLDER, self.card())
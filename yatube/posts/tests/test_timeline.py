@@ -0,0 +1,116 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import tasks
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="Stas")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.old_post = Post.objects.create(author=cls.author, text="Старый")
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTest.reader)
+        self.author_client = Client()
+        self.author_client.force_login(TimelineTest.author)
+
+    def test_follow_backfills_and_new_post_fans_out(self):
+        """Подписка дозаполняет ленту, новый пост попадает в нее сразу."""
+        self.reader_client.get(
+            reverse("posts:profile_follow", kwargs={"username": "Stas"})
+        )
+        post = Post.objects.create(author=self.author, text="Новый")
+        entries = TimelineEntry.objects.filter(user=self.reader)
+        self.assertEqual(
+            list(entries.values_list("post_id", flat=True)),
+            [post.pk, self.old_post.pk],
+        )
+
+    def test_unfollow_and_delete_clean_timeline(self):
+        """Отписка и удаление поста чистят ленту."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Новый")
+        self.author_client.get(
+            reverse("posts:post_delete", kwargs={"post_id": post.pk})
+        )
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.reader_client.get(
+            reverse("posts:profile_unfollow", kwargs={"username": "Stas"})
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+    def test_rebuild_command_restores_timeline(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command("rebuild_timelines", stdout=StringIO())
+        response = self.reader_client.get(reverse("posts:follow_index"))
+        self.assertEqual(
+            list(response.context["page_obj"]), [TimelineTest.old_post]
+        )
+
+    @override_settings(TIMELINE_PUSH_FOLLOWER_LIMIT=0)
+    def test_popular_author_is_pulled_and_merged(self):
+        """Посты популярного автора не раздаются, но есть в ленте."""
+        other = User.objects.create_user(username="Other")
+        pushed = Post.objects.create(author=other, text="1")
+        TimelineEntry.objects.create(
+            user=self.reader, post=pushed, pub_date=pushed.pub_date
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="Новый")
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.reader_client.get(reverse("posts:follow_index"))
+        self.assertEqual(
+            [p.text for p in response.context["page_obj"]],
+            ["Новый", "1", "Старый"],
+        )
+
+    @override_settings(TIMELINE_PUSH_FOLLOWER_LIMIT=1)
+    def test_crossing_follower_limit_rebalances_timelines(self):
+        """После пересечения порога посты автора не пропадают из ленты."""
+        other = User.objects.create_user(username="Other")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        tasks.run_pending()
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=other).delete()
+        tasks.run_pending()
+        response = self.reader_client.get(reverse("posts:follow_index"))
+        self.assertEqual(
+            list(response.context["page_obj"]), [TimelineTest.old_post]
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.reader, post=self.old_post
+            ).exists()
+        )
+
+    def test_strategies_return_same_feed(self):
+        """Стратегии push, pull и hybrid отдают одинаковую ленту."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text="Новый")
+        pages = [
+            list(
+                timeline.follow_paginator(self.reader, 10, strategy)
+                .cursor_page()
+                .object_list
+            )
+            for strategy in timeline.STRATEGIES
+        ]
+        self.assertEqual(pages[0], pages[1])
+        self.assertEqual(pages[1], pages[2])
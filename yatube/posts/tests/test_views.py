@@ -7,6 +7,7 @@ from django.test import Client, TestCase
 from django.urls import reverse
 from django import forms
 
+from core.testing import QueryBudgetTestMixin
 from posts.models import Post, Group, Comment, Follow
 
 
@@ -47,6 +48,7 @@ class PostViewTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client1 = Client()
@@ -161,16 +163,45 @@ class PostViewTest(TestCase):
         self.assertEqual(len(response.context["comments"]), 1)
 
     def test_cache_home_page(self):
-        """Тестируем удаление одной записи и отображение кеша"""
-        response_predelete = self.guest_client.get(reverse("posts:index"))
-        Post.objects.filter(pk=PostViewTest.post_1.pk).delete()
-        response_deleted = self.guest_client.get(reverse("posts:index"))
-        content_deleted = response_deleted.content
-        self.assertEqual(response_predelete.content, content_deleted)
-        cache.clear()
+        """Главная кэшируется, пока посты не меняются через модель."""
         response_cached = self.guest_client.get(reverse("posts:index"))
-        content_cached = response_cached.content
-        self.assertNotEqual(content_deleted, content_cached)
+        Post.objects.filter(pk=PostViewTest.post_1.pk).update(text="Тайно")
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertEqual(response_cached.content, response.content)
+        cache.clear()
+        response = self.guest_client.get(reverse("posts:index"))
+        self.assertNotEqual(response_cached.content, response.content)
+
+    def test_post_writes_invalidate_feed_caches(self):
+        """Создание и удаление поста сразу видны в лентах."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "test-slug"}),
+            reverse("posts:profile", kwargs={"username": "Stas"}),
+        )
+        for url in urls:
+            self.guest_client.get(url)
+        post = Post.objects.create(
+            author=PostViewTest.user, text="Свежий пост", group=self.group_1
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, "Свежий пост")
+        post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, "Свежий пост")
+
+    def test_group_change_invalidates_old_group(self):
+        """Перенос поста в другую группу сбрасывает кэш прежней группы."""
+        url = reverse("posts:group_posts", kwargs={"slug": "test-slug"})
+        self.assertContains(self.guest_client.get(url), "Тестовый текст1")
+        post = Post.objects.get(pk=PostViewTest.post_1.pk)
+        post.group = self.group_2
+        post.save()
+        self.assertNotContains(self.guest_client.get(url), "Тестовый текст1")
 
     def test_following(self):
         """Тестирование подписок."""
@@ -250,6 +281,7 @@ class PaginatorViewsTest(TestCase):
         cls.posts = Post.objects.bulk_create(cls.posts_obj)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorViewsTest.user)
@@ -292,3 +324,230 @@ class PaginatorViewsTest(TestCase):
             reverse("posts:profile", kwargs={"username": "Stas"}) + "?page=2"
         )
         self.assertEqual(len(response.context["page_obj"]), 5)
+
+    def test_home_cursor_pages_cover_all_records(self):
+        """Курсорные страницы главной идут без пропусков и повторов."""
+        response = self.guest_client.get(reverse("posts:index"))
+        first_page = list(response.context["page_obj"])
+        next_cursor = response.context["page_obj"].paginator.next_cursor
+        response = self.guest_client.get(
+            reverse("posts:index") + f"?cursor={next_cursor}"
+        )
+        page_obj = response.context["page_obj"]
+        self.assertEqual(page_obj.number, 2)
+        self.assertFalse(page_obj.has_next())
+        self.assertEqual(
+            {post.pk for post in first_page + list(page_obj)},
+            set(Post.objects.values_list("pk", flat=True)),
+        )
+        previous_cursor = page_obj.paginator.previous_cursor
+        response = self.guest_client.get(
+            reverse("posts:index") + f"?cursor={previous_cursor}"
+        )
+        self.assertEqual(list(response.context["page_obj"]), first_page)
+
+    def test_deep_page_number_is_bounded(self):
+        """Устаревший ?page=N не уходит глубже разрешенного OFFSET."""
+        with self.settings(PAGINATOR_MAX_OFFSET_PAGE=1):
+            response = self.guest_client.get(
+                reverse("posts:index") + "?page=2"
+            )
+        self.assertEqual(response.context["page_obj"].number, 1)
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+    def test_page_number_past_end_gives_last_page(self):
+        """Номер за концом ленты отдает последнюю страницу."""
+        response = self.guest_client.get(
+            reverse("posts:index") + "?page=5000"
+        )
+        page_obj = response.context["page_obj"]
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), 5)
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый токен курсора отдает первую страницу."""
+        response = self.guest_client.get(
+            reverse("posts:index") + "?cursor=broken"
+        )
+        self.assertEqual(response.context["page_obj"].number, 1)
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+
+class QueryBudgetViewsTest(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Stas")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        for i in range(12):
+            post = Post.objects.create(
+                author=cls.user,
+                text=f"{i} Тестовый пост #test @Reader",
+                group=cls.group,
+            )
+            Comment.objects.create(post=post, author=cls.reader, text="1")
+        cls.post = post
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetViewsTest.reader)
+
+    def test_feeds_fit_query_budget(self):
+        """Ленты и страница поста укладываются в бюджет запросов."""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "test-slug"}),
+            reverse("posts:profile", kwargs={"username": "Stas"}),
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk}),
+            reverse("posts:follow_index"),
+            reverse("posts:tag_posts", kwargs={"name": "test"}),
+            reverse("posts:mentions"),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertWithinQueryBudget(self.authorized_client, url)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Stas")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Тестовый пост", group=cls.group
+        )
+        cls.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": "test-slug"}),
+            reverse("posts:profile", kwargs={"username": "Stas"}),
+            reverse("posts:post_detail", kwargs={"post_id": cls.post.pk}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTest.reader)
+
+    def revalidate(self, client, url, etag):
+        return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_pages_not_modified(self):
+        """Повторный запрос без изменений получает 304."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertNotIn("Last-Modified", response)
+                self.assertEqual(
+                    self.revalidate(
+                        self.guest_client, url, response["ETag"]
+                    ),
+                    304,
+                )
+
+    def test_if_modified_since_ignored(self):
+        """Правка поста не теряется за старой датой публикации."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.guest_client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = "Правка"
+        post.save()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT"
+        )
+        self.assertContains(response, "Правка")
+
+    def test_validator_depends_on_viewer(self):
+        """Другой зритель не получает чужую версию страницы."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)["ETag"]
+                self.assertEqual(
+                    self.revalidate(self.authorized_client, url, etag), 200
+                )
+
+    def test_writes_change_validators(self):
+        """Правка поста, комментарий и подписка меняют валидаторы."""
+        detail = self.urls[3]
+        profile = self.urls[2]
+        etags = {
+            url: self.authorized_client.get(url)["ETag"] for url in self.urls
+        }
+        self.post.text = "Новый текст"
+        self.post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.revalidate(self.authorized_client, url, etags[url]),
+                    200,
+                )
+        etag = self.authorized_client.get(detail)["ETag"]
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Комментарий"
+        )
+        self.assertEqual(
+            self.revalidate(self.authorized_client, detail, etag), 200
+        )
+        etag = self.authorized_client.get(profile)["ETag"]
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(
+            self.revalidate(self.authorized_client, profile, etag), 200
+        )
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="Stas")
+        cls.reader = User.objects.create_user(username="Reader")
+        cls.post = Post.objects.create(author=cls.user, text="Тестовый пост")
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(AnonymousPageCacheTest.reader)
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторную страницу аноним получает из кэша без рендеринга."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(1):
+            cached = self.guest_client.get(url)
+        self.assertIsNone(cached.context)
+        self.assertEqual(cached.content, first.content)
+
+    def test_writes_invalidate_anonymous_page(self):
+        """Новый комментарий сразу виден анонимам."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text="Свежий комментарий"
+        )
+        self.assertContains(self.guest_client.get(url), "Свежий комментарий")
+
+    def test_personalized_fragments_around_shared_body(self):
+        """Общая разметка поста не мешает персональным фрагментам."""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        guest = self.guest_client.get(url)
+        self.assertNotContains(guest, "Добавить комментарий")
+        response = self.authorized_client.get(url)
+        self.assertContains(response, "Добавить комментарий")
+        self.assertContains(response, "Пользователь: Reader")
+        self.assertContains(response, self.post.text)
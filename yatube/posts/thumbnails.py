@@ -0,0 +1,222 @@
+"""Миниатюры картинок постов.
+
+Варианты картинки (несколько ширин в JPEG и, если есть, WebP) готовит
+фоновая задача ``build``, которую сигнал сохранения поста ставит при
+смене картинки, как бы пост ни сохранялся: автор не ждет сжатия. Бэкенд
+``EagerThumbnailBackend`` в запросе только ищет готовые миниатюры в
+хранилище ключей sorl, а если их еще нет, отдает заглушку вместо того,
+чтобы открывать и сжимать оригинал.
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.templatetags.static import static
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import (
+    DummyImageFile,
+    ImageFile,
+    deserialize_image_file,
+)
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.tasks import task
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Ширины вариантов картинки поста; пропорции кадра 960x339.
+WIDTHS = (320, 640, 960)
+# WebP доступен, только если Pillow собран с libwebp.
+FORMATS = ("WEBP", "JPEG") if features.check("webp") else ("JPEG",)
+VARIANTS = tuple(
+    (
+        f"{width}x{round(width * 339 / 960)}",
+        {
+            "crop": "center",
+            "upscale": True,
+            "format": format_,
+            "quality": settings.THUMBNAIL_VARIANT_QUALITY,
+        },
+    )
+    for format_ in FORMATS
+    for width in WIDTHS
+)
+
+_local = threading.local()
+
+
+class Placeholder(DummyImageFile):
+    @property
+    def url(self):
+        return static(settings.THUMBNAIL_PLACEHOLDER)
+
+
+class EagerThumbnailBackend(ThumbnailBackend):
+    def thumbnail_file(self, file_, geometry_string, options):
+        """Файл миниатюры, под которым sorl хранит ее в хранилище ключей."""
+        if not file_:
+            raise ValueError("falsey file_ argument in get_thumbnail()")
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault("format", self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if getattr(_local, "generating", False):
+            return super().get_thumbnail(file_, geometry_string, **options)
+        thumbnail = default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, options)
+        )
+        return thumbnail or Placeholder(geometry_string)
+
+    def get_thumbnails(self, files, geometry_string, **options):
+        """Готовые миниатюры одной геометрии сразу для нескольких картинок."""
+        found = self.get_variants(files, ((geometry_string, options),))
+        return {file_: variants[0] for file_, variants in found.items()}
+
+    def get_variants(self, files, variants):
+        """Готовые миниатюры всех вариантов для нескольких картинок.
+
+        Ключи читаются одним ``get_many`` из кэша хранилища sorl, промахи
+        добираются одним запросом к его таблице.
+        """
+        keys = {
+            (file_, index): add_prefix(
+                self.thumbnail_file(file_, geometry, dict(options)).key
+            )
+            for file_ in files
+            for index, (geometry, options) in enumerate(variants)
+        }
+        kvstore = default.kvstore
+        if not keys:
+            return {}
+        if isinstance(kvstore, CachedDBKVStore):
+            values = self._load(kvstore, set(keys.values()))
+        else:
+            values = {
+                key: kvstore._get_raw(key) or EMPTY_VALUE
+                for key in keys.values()
+            }
+        found = {}
+        for (file_, index), key in keys.items():
+            value = values.get(key, EMPTY_VALUE)
+            found.setdefault(file_, []).append(
+                deserialize_image_file(value)
+                if value != EMPTY_VALUE
+                else Placeholder(variants[index][0])
+            )
+        return found
+
+    @staticmethod
+    def _load(kvstore, keys):
+        values = kvstore.cache.get_many(list(keys))
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = dict(
+                KVStoreModel.objects.filter(key__in=missing).values_list(
+                    "key", "value"
+                )
+            )
+            kvstore.cache.set_many(
+                {key: found.get(key, EMPTY_VALUE) for key in missing},
+                sorl_settings.THUMBNAIL_CACHE_TIMEOUT,
+            )
+            values.update(found)
+        return values
+
+
+class Picture:
+    """Адаптивная картинка поста: ``srcset`` по форматам и запасной JPEG."""
+
+    def __init__(self, thumbnails):
+        self.ready = not any(
+            isinstance(thumbnail, Placeholder) for thumbnail in thumbnails
+        )
+        self.sizes = settings.THUMBNAIL_SIZES
+        formats = {}
+        for (geometry, options), thumbnail in zip(VARIANTS, thumbnails):
+            formats.setdefault(options["format"], []).append(thumbnail)
+        fallback = formats["JPEG"]
+        self.src = fallback[-1]
+        self.srcset = _srcset(fallback)
+        self.webp_srcset = (
+            _srcset(formats["WEBP"]) if "WEBP" in formats else None
+        )
+
+
+def _srcset(thumbnails):
+    return ", ".join(
+        f"{thumbnail.url} {thumbnail.width}w" for thumbnail in thumbnails
+    )
+
+
+def attach(posts):
+    """Проставляет постам ``picture`` одной выборкой из хранилища sorl."""
+    files = [post.image.name for post in posts if post.image]
+    found = default.backend.get_variants(files, VARIANTS)
+    for post in posts:
+        post.picture = (
+            Picture(found[post.image.name]) if post.image else None
+        )
+
+
+def _create(name, geometry, options):
+    _local.generating = True
+    try:
+        default.backend.get_thumbnail(name, geometry, **options)
+    finally:
+        _local.generating = False
+
+
+def _generate(name):
+    created = False
+    for geometry, options in VARIANTS:
+        found = default.backend.get_thumbnail(name, geometry, **options)
+        if isinstance(found, Placeholder):
+            _create(name, geometry, options)
+            created = True
+    if created:
+        for post in Post.objects.filter(image=name):
+            post.save(update_fields=["updated"])
+    return created
+
+
+def generate(name):
+    """Создает недостающие миниатюры картинки для геометрий шаблонов.
+
+    Посты с этой картинкой пересохраняются, чтобы кэши карточек и лент
+    сменили заглушку на готовую миниатюру.
+    """
+    try:
+        return _generate(name)
+    except Exception:
+        logger.exception("Не удалось создать миниатюры для %s", name)
+        return False
+
+
+@task
+def build(name):
+    """Фоновая задача: миниатюры картинки; при ошибке задача повторится."""
+    _generate(name)
+
+
+def schedule_for(post):
+    """Ставит в очередь миниатюры картинки поста.
+
+    Задача пишется в текущей транзакции и видна воркеру после коммита.
+    """
+    if post.image:
+        build.delay(post.image.name)
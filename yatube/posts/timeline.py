@@ -0,0 +1,213 @@
+"""Лента подписок: гибрид раздачи при записи и подтягивания при чтении.
+
+Посты обычных авторов раскладываются по ``TimelineEntry`` подписчиков в
+момент публикации. Авторы, у которых подписчиков больше
+``TIMELINE_PUSH_FOLLOWER_LIMIT``, не раздаются: их посты читаются при
+открытии ленты и сливаются с материализованной частью. В запросе
+публикации раздается только первая пачка подписчиков, остальные пачки
+раздает фоновая задача.
+"""
+from django.conf import settings
+from django.db.models import F
+
+from core.tasks import task
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginators import CursorPaginator, MergedCursorPaginator, request_page
+
+PUSH = "push"
+PULL = "pull"
+HYBRID = "hybrid"
+STRATEGIES = (PUSH, PULL, HYBRID)
+
+
+def _insert(rows):
+    """Пишет тройки (читатель, пост, дата) в ленты пачками."""
+    batch = []
+    for user_id, post_id, pub_date in rows:
+        batch.append(
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        )
+        if len(batch) >= settings.TIMELINE_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def pulled_authors(author_ids):
+    """Отбирает авторов, чьи посты читаются при открытии ленты."""
+    return set(
+        UserStats.objects.filter(
+            user_id__in=author_ids,
+            followers_count__gt=settings.TIMELINE_PUSH_FOLLOWER_LIMIT,
+        ).values_list("user_id", flat=True)
+    )
+
+
+def is_pulled(author_id, strategy=HYBRID):
+    """Проверяет, читаются ли посты автора при открытии ленты."""
+    if strategy == HYBRID:
+        return author_id in pulled_authors([author_id])
+    return strategy == PULL
+
+
+def _fan_out_batch(post, after=0):
+    batch_size = settings.TIMELINE_BATCH_SIZE
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id, user_id__gt=after)
+        .order_by("user_id")
+        .values_list("user_id", flat=True)[:batch_size]
+    )
+    _insert((user_id, post.pk, post.pub_date) for user_id in followers)
+    if len(followers) == batch_size:
+        fan_out_more.delay(post.pk, followers[-1])
+
+
+@task
+def fan_out_more(post_id, after):
+    """Фоновая задача: следующая пачка подписчиков после ``after``."""
+    post = (
+        Post.objects.filter(pk=post_id).only("author_id", "pub_date").first()
+    )
+    if post is not None:
+        _fan_out_batch(post, after)
+
+
+def fan_out(post, strategy=HYBRID):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_pulled(post.author_id, strategy):
+        _fan_out_batch(post)
+
+
+def subscribe(user_id, author_id, strategy=HYBRID):
+    """Добавляет посты автора в ленту нового подписчика."""
+    if is_pulled(author_id, strategy):
+        return
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .values_list("pk", "pub_date")
+        .iterator()
+    )
+    _insert((user_id, post_id, pub_date) for post_id, pub_date in posts)
+
+
+def followers_changed(author_id, delta):
+    """Перестраивает ленты, если автор пересек ``TIMELINE_PUSH_FOLLOWER_LIMIT``.
+
+    Автор читается при открытии ленты, пока подписчиков больше порога.
+    Опустившись до порога, он снова раздается, и его прежние посты нужно
+    дописать в ленты подписчиков; поднявшись выше, он больше не нужен в
+    материализованных лентах.
+    """
+    limit = settings.TIMELINE_PUSH_FOLLOWER_LIMIT
+    crossed = limit + 1 if delta > 0 else limit
+    if UserStats.objects.filter(
+        user_id=author_id, followers_count=crossed
+    ).exists():
+        rebalance.delay(author_id)
+
+
+@task
+def rebalance(author_id, after=0):
+    """Фоновая задача: приводит ленты пачки подписчиков после ``after``.
+
+    Стратегия автора проверяется на каждой пачке, поэтому при повторном
+    пересечении порога цепочки задач сходятся к последнему состоянию.
+    """
+    followers = list(
+        Follow.objects.filter(author_id=author_id, user_id__gt=after)
+        .order_by("user_id")
+        .values_list("user_id", flat=True)[: settings.TIMELINE_BATCH_SIZE]
+    )
+    if not followers:
+        return
+    if is_pulled(author_id):
+        TimelineEntry.objects.filter(
+            user_id__in=followers, post__author_id=author_id
+        ).delete()
+    else:
+        posts = (
+            Post.objects.filter(author_id=author_id)
+            .values_list("pk", "pub_date")
+            .iterator()
+        )
+        _insert(
+            (user_id, post_id, pub_date)
+            for post_id, pub_date in posts
+            for user_id in followers
+        )
+    if len(followers) == settings.TIMELINE_BATCH_SIZE:
+        rebalance.delay(author_id, followers[-1])
+
+
+def unsubscribe(user_id, author_id):
+    """Убирает посты автора из ленты бывшего подписчика."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты указанных читателей или всех сразу.
+
+    Нужна после смены ``TIMELINE_PUSH_FOLLOWER_LIMIT``: авторы, опустившиеся
+    ниже порога, снова раздаются, а подтягиваемые убираются из лент.
+    """
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.filter(author__posts__isnull=False)
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+    pulled = pulled_authors(follows.values("author_id"))
+    entries.delete()
+    _insert(
+        follows.exclude(author_id__in=pulled)
+        .values_list("user_id", "author__posts__pk", "author__posts__pub_date")
+        .iterator()
+    )
+
+
+def _pushed_source(user, per_page):
+    posts = (
+        Post.objects.filter(timeline_entries__user=user)
+        .annotate(
+            feed_date=F("timeline_entries__pub_date"),
+            feed_key=F("timeline_entries__post_id"),
+        )
+        .select_related("author", "group")
+    )
+    return CursorPaginator(
+        posts, per_page, date_field="feed_date", key_field="feed_key"
+    )
+
+
+def _pulled_source(author_id, per_page):
+    posts = Post.objects.filter(author_id=author_id).select_related(
+        "author", "group"
+    )
+    return CursorPaginator(posts, per_page)
+
+
+def follow_paginator(user, per_page, strategy=HYBRID):
+    """Паджинатор ленты подписок по выбранной стратегии."""
+    followed = Follow.objects.filter(user=user).values_list(
+        "author_id", flat=True
+    )
+    if strategy == PUSH:
+        return _pushed_source(user, per_page)
+    if strategy == PULL:
+        sources = []
+        pulled = followed
+    else:
+        sources = [_pushed_source(user, per_page)]
+        pulled = pulled_authors(followed)
+    sources += [_pulled_source(author_id, per_page) for author_id in pulled]
+    return MergedCursorPaginator(sources, per_page)
+
+
+def follow_feed(request):
+    """Страница ленты подписок текущего пользователя."""
+    return request_page(
+        request, follow_paginator(request.user, settings.PER_PAGE_COUNT)
+    )
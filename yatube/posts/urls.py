@@ -23,5 +23,11 @@ urlpatterns = [
     path("profile/<str:username>/", views.profile, name="profile"),
     path("posts/<post_id>/", views.post_detail, name="post_detail"),
     path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.post_search, name="post_search"),
+    path("tag/<str:name>/", views.tag_posts, name="tag_posts"),
+    path("mentions/", views.mentions, name="mentions"),
+    path(
+        "autocomplete/", views.autocomplete_lookup, name="autocomplete"
+    ),
     path("", views.index, name="index"),
 ]
@@ -1,44 +1,61 @@
+from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import redirect, render, get_object_or_404
-from django.core.paginator import Paginator
 from django.contrib.auth.decorators import login_required
-from .models import Post, Group, Comment, Follow, User
-from .forms import PostForm, CommentForm
-from django.conf import settings
-
-
+from core.query_budget import query_budget
+from .models import Post, Group, Comment, Follow, Tag, User
+from .forms import PostForm, CommentForm, SearchForm
+from . import autocomplete, feed_cache, search, tags
+from .conditional import (
+    group_condition,
+    index_condition,
+    post_condition,
+    profile_condition,
+)
+from .counters import stats_for
+from .paginators import request_page
+from .timeline import follow_feed
+
+
+@query_budget(4)
+@index_condition
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, settings.PER_PAGE_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = Post.objects.select_related("author", "group")
+    page_obj = feed_cache.page(request, feed_cache.INDEX, posts)
     template = "posts/index.html"
     context = {
         "posts": posts,
         "page_obj": page_obj,
+        **feed_cache.context(feed_cache.INDEX),
     }
     return render(request, template, context)
 
 
+@query_budget(5)
+@group_condition
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.post_set.all()
-    paginator = Paginator(posts, settings.PER_PAGE_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = group.post_set.select_related("author", "group")
+    page_obj = feed_cache.page(
+        request, feed_cache.group_scope(group.pk), posts
+    )
     context = {
         "group": group,
         "posts": posts,
         "page_obj": page_obj,
+        **feed_cache.context(feed_cache.group_scope(group.pk)),
     }
     return render(request, "posts/group_list.html", context)
 
 
+@query_budget(7)
+@profile_condition
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, settings.PER_PAGE_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    posts = author.posts.select_related("author", "group")
+    page_obj = feed_cache.page(
+        request, feed_cache.author_scope(author.pk), posts
+    )
     following = (
         request.user.is_authenticated
         and Follow.objects.filter(user=request.user, author=author).exists()
@@ -47,25 +64,101 @@ def profile(request, username):
         "posts": posts,
         "page_obj": page_obj,
         "author": author,
+        "stats": stats_for(author.pk),
         "following": following,
+        **feed_cache.context(feed_cache.author_scope(author.pk)),
     }
     return render(request, "posts/profile.html", context)
 
 
+@query_budget(6)
+@post_condition
 def post_detail(request, post_id):
-    posts = get_object_or_404(Post, pk=post_id)
-    counter = Post.objects.filter(author=posts.author)
+    posts = get_object_or_404(
+        Post.objects.select_related("author", "group"), pk=post_id
+    )
+    counter = stats_for(posts.author_id)
     form = CommentForm()
-    comments = Comment.objects.filter(post_id=post_id)
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        "author"
+    )
     context = {
         "form": form,
         "comments": comments,
         "counter": counter,
         "posts": posts,
+        **feed_cache.context(feed_cache.post_scope(posts.pk)),
     }
     return render(request, "posts/post_detail.html", context)
 
 
+@query_budget(7)
+def post_search(request):
+    form = SearchForm(request.GET)
+    page_obj = None
+    query = request.GET.copy()
+    query.pop("cursor", None)
+    query.pop("page", None)
+    if form.is_valid() and form.cleaned_data["q"]:
+        filters = {
+            "text": form.cleaned_data["q"],
+            "group": form.cleaned_data["group"],
+            "author": form.cleaned_data["author"],
+        }
+        results = search.search(
+            **filters,
+            boundary=search.unsign_boundary(
+                request.GET.get("window"), **filters
+            ),
+        )
+        page_obj = request_page(
+            request, search.SearchPaginator(results, settings.PER_PAGE_COUNT)
+        )
+        query["window"] = search.sign_boundary(results.boundary, **filters)
+    context = {
+        "form": form,
+        "page_obj": page_obj,
+        "query": query.urlencode(),
+    }
+    return render(request, "posts/search.html", context)
+
+
+@query_budget(2)
+def autocomplete_lookup(request):
+    kind = request.GET.get("type")
+    kinds = (kind,) if kind in autocomplete.KINDS else autocomplete.KINDS
+    items = autocomplete.lookup(request.GET.get("q", ""), kinds)
+    return JsonResponse(
+        {"results": [autocomplete.as_json(item) for item in items]}
+    )
+
+
+@query_budget(4)
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=tags.normalize_tag(name))
+    page_obj = request_page(
+        request, tags.tag_paginator(tag, settings.PER_PAGE_COUNT)
+    )
+    context = {
+        "tag": tag,
+        "page_obj": page_obj,
+    }
+    return render(request, "posts/tag.html", context)
+
+
+@query_budget(4)
+@login_required
+def mentions(request):
+    page_obj = request_page(
+        request,
+        tags.mentions_paginator(request.user, settings.PER_PAGE_COUNT),
+    )
+    context = {
+        "page_obj": page_obj,
+    }
+    return render(request, "posts/mentions.html", context)
+
+
 @login_required
 def post_create(request):
     template = "posts/post_create.html"
@@ -93,8 +186,7 @@ def post_edit(request, post_id):
         request.POST or None, files=request.FILES or None, instance=post
     )
     if post.author == request.user and form.is_valid():
-        post = form.save()
-        post.save()
+        form.save()
         return redirect("posts:post_detail", post_id=post.pk)
     context = {
         "post": post,
@@ -116,12 +208,10 @@ def add_comment(request, post_id):
     return redirect("posts:post_detail", post_id=post_id)
 
 
+@query_budget(6)
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(post_list, settings.PER_PAGE_COUNT)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    page_obj = follow_feed(request)
     context = {
         "page_obj": page_obj,
     }
@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core import mail
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core import tasks
+from core.models import OutgoingEmail
+
 User = get_user_model()
 
 
@@ -27,3 +31,25 @@ class PostViewTest(TestCase):
             with self.subTest(reverse_name=reverse_name):
                 response = self.authorized_client.get(reverse_name)
                 self.assertTemplateUsed(response, template)
+
+
+@override_settings(
+    EMAIL_BACKEND="core.mail.QueuedEmailBackend",
+    QUEUED_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+)
+class PasswordResetMailTest(TestCase):
+    def test_reset_email_sent_by_worker(self):
+        """Письмо сброса пароля отправляет воркер, а не запрос."""
+        User.objects.create_user(
+            username="Stas", email="stas@example.com", password="secret-42"
+        )
+        response = Client().post(
+            reverse("users:password_reset"), {"email": "stas@example.com"}
+        )
+        self.assertRedirects(response, reverse("users:password_reset_done"))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["stas@example.com"])
+        self.assertFalse(OutgoingEmail.objects.exists())
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -143,19 +144,114 @@ STATICFILES_DIRS = (os.path.join(BASE_DIR, "static"),)
 LOGIN_URL = "users:login"
 LOGIN_REDIRECT_URL = "posts:index"
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Письма уходят из запроса в очередь и отправляются воркером run_tasks
+# через QUEUED_EMAIL_BACKEND.
+EMAIL_BACKEND = "core.mail.QueuedEmailBackend"
+
+QUEUED_EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+
+EMAIL_BATCH_SIZE = 100
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 PER_PAGE_COUNT = 10
 
+# Длина фрагмента с подсветкой в результатах поиска, в словах.
+SEARCH_SNIPPET_TOKENS = 16
+
+# Релевантность считается среди стольких самых новых совпадений.
+SEARCH_RANK_WINDOW = 2000
+
+PAGINATOR_MAX_OFFSET_PAGE = 50
+
+# Автодополнение: подсказок в ответе, записей для админки, кандидатов на
+# разбор в одном поиске, изменений из журнала до полной перестройки
+# индекса и время жизни записи журнала в секундах.
+AUTOCOMPLETE_LIMIT = 10
+
+AUTOCOMPLETE_ADMIN_LIMIT = 100
+
+AUTOCOMPLETE_MAX_CANDIDATES = 200
+
+AUTOCOMPLETE_MAX_CHANGES = 1000
+
+AUTOCOMPLETE_CHANGE_TIMEOUT = 24 * 60 * 60
+
+TIMELINE_BATCH_SIZE = 1000
+
+TIMELINE_PUSH_FOLLOWER_LIMIT = 10000
+
+QUERY_BUDGET_RAISE = False
+
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
-
+# Отдача медиа веб-сервером: "X-Sendfile" (Apache, lighttpd) или
+# "X-Accel-Redirect" (nginx, internal location ниже указывает в MEDIA_ROOT).
+MEDIA_SENDFILE = os.environ.get("YATUBE_MEDIA_SENDFILE") or None
+MEDIA_ACCEL_REDIRECT_LOCATION = "/protected-media/"
+# Для имен без хэша содержимого.
+MEDIA_CACHE_TIMEOUT = 60 * 60
+
+# Для нескольких воркеров нужен общий кэш, например локальный
+# YATUBE_CACHE_BACKEND=core.cache_backends.SQLiteCache
+# YATUBE_CACHE_LOCATION=/var/tmp/yatube-cache.sqlite3
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": os.environ.get(
+            "YATUBE_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.environ.get("YATUBE_CACHE_LOCATION", ""),
+        "OPTIONS": {"MAX_ENTRIES": 100000},
     }
 }
+
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+THUMBNAIL_CACHE = "default"
+
+THUMBNAIL_BACKEND = "posts.thumbnails.EagerThumbnailBackend"
+
+THUMBNAIL_PLACEHOLDER = "img/placeholder.svg"
+
+THUMBNAIL_VARIANT_QUALITY = 80
+
+# Загрузки больше 1 МБ пишутся во временный файл, а не держатся в памяти.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+
+POST_IMAGE_MAX_PIXELS = 40_000_000
+
+THUMBNAIL_SIZES = "(max-width: 992px) 100vw, 960px"
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+ANONYMOUS_PAGE_CACHE_TIMEOUT = 60 * 10
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Сколько id можно запросить одним batch-запросом API.
+API_BATCH_MAX_IDS = 100
+
+STAMPEDE_STALE_TIMEOUT = 60 * 5
+
+STAMPEDE_LOCK_TIMEOUT = 10
+
+# Сколько ждать чужого расчета значения, которого нет в кэше, в секундах.
+STAMPEDE_WAIT_TIMEOUT = 0.5
+
+STAMPEDE_BETA = 1.0
+
+# Фоновые задачи: python manage.py run_tasks
+TASKS_CONCURRENCY = 2
+
+TASKS_POLL_INTERVAL = 1.0
+
+TASKS_VISIBILITY_TIMEOUT = 60 * 5
+
+TASKS_MAX_ATTEMPTS = 5
+
+TASKS_RETRY_BACKOFF = 10
+
+TASKS_RETRY_BACKOFF_MAX = 60 * 60
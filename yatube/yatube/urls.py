@@ -14,26 +14,30 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core import media
 
 urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
+    path("api/v1/", include("posts.api_urls", namespace="api")),
     path("admin/", admin.site.urls),
     path("auth/", include("users.urls", namespace="users")),
     path("about/", include("about.urls", namespace="about")),
     path("auth/", include("django.contrib.auth.urls")),
+    re_path(
+        r"^%s(?P<path>.+)$" % settings.MEDIA_URL.lstrip("/"),
+        media.serve,
+        name="media",
+    ),
 ]
 
 handler404 = "core.views.page_not_found"
 handler500 = "core.views.server_error"
 handler403 = "core.views.permission_denied"
 
-if settings.DEBUG:
-    #import debug_toolbar
-
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
-    #urlpatterns += (path("__debug__/", include(debug_toolbar.urls)),)
+# if settings.DEBUG:
+#     import debug_toolbar
+#
+#     urlpatterns += (path("__debug__/", include(debug_toolbar.urls)),)